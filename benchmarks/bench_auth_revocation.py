@@ -0,0 +1,102 @@
+"""Authentications/sec of verify_token with session revocation checking
+
+Verifies --tokens distinct access tokens (each in its own session) through
+AuthMiddleware.verify_token on one core in three setups:
+
+  * no_revocations: the revocation list is empty
+  * revocation_list: --revoked other sessions are revoked, so every check
+    is a lookup in a populated list, plus one revoked token to confirm
+    rejection
+  * db_check: the same list is consulted through a per-request SELECT on
+    refresh_tokens (SQLite), the approach the in-memory list replaces
+
+    python -m benchmarks.bench_auth_revocation --tokens 10000 --revoked 100000
+"""
+import argparse
+import json
+import secrets
+import time
+from datetime import datetime, timedelta
+from benchmarks.common import use_sqlite
+
+def throughput(verify, credentials, seconds):
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for credential in credentials:
+            verify(credential)
+        count += len(credentials)
+    return count / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=10000)
+    parser.add_argument("--revoked", type=int, default=100000, help="Revoked sessions held in the list")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    use_sqlite()
+    from fastapi import HTTPException
+    from fastapi.security import HTTPAuthorizationCredentials
+    from sqlalchemy import select
+    from config.database import create_tables, session
+    from middlewares.auth import auth_middleware
+    from models.models import RefreshToken
+    from services.session_services import hash_refresh_token
+    from utils.revocation import RevocationList
+    from utils.secure import create_access_token
+
+    sessions = [secrets.token_hex(16) for _ in range(args.tokens)]
+    credentials = [
+        HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token({"sub": str(i + 1), "sid": sid}))
+        for i, sid in enumerate(sessions)
+    ]
+    revoked = [secrets.token_hex(16) for _ in range(args.revoked)]
+    until = time.time() + 3600
+
+    auth_middleware.revocations = RevocationList()
+    empty = throughput(auth_middleware.verify_token, credentials, args.seconds)
+
+    populated = RevocationList()
+    populated.revoke(revoked, until)
+    auth_middleware.revocations = populated
+    listed = throughput(auth_middleware.verify_token, credentials, args.seconds)
+
+    victim = HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token({"sub": "1", "sid": revoked[0]}))
+    try:
+        auth_middleware.verify_token(victim)
+        raise SystemExit("A token of a revoked session was accepted")
+    except HTTPException as e:
+        assert e.detail == "Token has been revoked"
+
+    # What every request would cost with the revocation state in the database
+    create_tables()
+    db = session()
+    now = datetime.utcnow()
+    db.bulk_insert_mappings(RefreshToken, [
+        {"token_hash": hash_refresh_token(sid), "session_id": sid, "user_id": 1, "created_at": now,
+         "expires_at": now + timedelta(days=7), "revoked_at": now}
+        for sid in revoked
+    ])
+    db.commit()
+
+    class DatabaseRevocations:
+        def __contains__(self, sid):
+            query = select(RefreshToken.id).where(RefreshToken.session_id == sid, RefreshToken.revoked_at.is_not(None))
+            return db.execute(query.limit(1)).first() is not None
+
+    auth_middleware.revocations = DatabaseRevocations()
+    database = throughput(auth_middleware.verify_token, credentials, args.seconds)
+    db.close()
+
+    print(json.dumps({
+        "tokens": args.tokens,
+        "revoked_sessions": args.revoked,
+        "no_revocations_per_sec": round(empty),
+        "revocation_list_per_sec": round(listed),
+        "db_check_per_sec": round(database),
+        "list_overhead_pct": round((empty / listed - 1) * 100, 1),
+        "speedup_vs_db_check": round(listed / database, 2),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Resolving a page's worth of user ids: N x GET /users/{id} vs one POST /users/batch
+
+Reports wall time per page render and the number of SQL statements each
+approach runs (from the db.query stage histogram).
+
+    python -m benchmarks.bench_batch_fetch --ids 200 --pages 20
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from benchmarks.common import use_sqlite, seed_users, summarize, BENCH_PASSWORD
+
+def query_count():
+    from utils.metrics import stage_seconds
+
+    state = stage_seconds._values.get(("db.query",))
+    return sum(state[:-1]) if state else 0
+
+async def run(args):
+    import httpx
+
+    use_sqlite()
+    from main import app
+    seed_users(args.users)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        response = await client.post("/users/login", json={"email": "user0@bench.local", "password": BENCH_PASSWORD})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        pages = [random.sample(range(1, args.users + 1), args.ids) for _ in range(args.pages)]
+
+        results = {}
+        for name in ("one_by_one", "batch"):
+            latencies = []
+            queries_before = query_count()
+            for ids in pages:
+                start = time.perf_counter()
+                if name == "batch":
+                    await client.post("/users/batch", json={"ids": ids}, headers=headers)
+                else:
+                    await asyncio.gather(*(client.get(f"/users/{user_id}", headers=headers) for user_id in ids))
+                latencies.append(time.perf_counter() - start)
+            results[name] = {
+                "page_render": summarize(latencies),
+                "queries_per_page": round((query_count() - queries_before) / args.pages, 1),
+            }
+
+    print(json.dumps({"ids_per_page": args.ids, "pages": args.pages, **results}, indent=2))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ids", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--users", type=int, default=5000)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Requests/sec of the sync vs async (DB_ASYNC) database stack
+
+Each mode runs in its own interpreter, because the engine is chosen at
+import time, against a fresh SQLite file (aiosqlite for the async mode).
+Point DATABASE_URL at a local MySQL to compare against a real server.
+
+    python -m benchmarks.bench_db_modes --requests 5000 --concurrency 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from benchmarks.common import use_sqlite, seed_users, summarize, BENCH_PASSWORD
+
+async def drive(args):
+    import httpx
+    from main import app
+
+    seed_users(args.users)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        response = await client.post("/users/login", json={"email": "user0@bench.local", "password": BENCH_PASSWORD})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        latencies = []
+        statuses = Counter()
+        remaining = iter(range(args.requests))
+
+        async def worker():
+            for i in remaining:
+                start = time.perf_counter()
+                response = await client.get(f"/users/{i % args.users + 1}", headers=headers)
+                statuses[response.status_code] += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "mode": "async" if os.getenv("DB_ASYNC") == "true" else "sync",
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "rps": round(args.requests / elapsed, 1),
+        "latency": summarize(latencies),
+        "statuses": dict(statuses),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        if "DATABASE_URL" not in os.environ:
+            use_sqlite()
+        print(json.dumps(asyncio.run(drive(args))))
+        return
+
+    results = []
+    for mode in ("false", "true"):
+        env = dict(os.environ, DB_ASYNC=mode)
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_db_modes", "--child",
+             "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+             "--users", str(args.users)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
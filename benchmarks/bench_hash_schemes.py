@@ -0,0 +1,55 @@
+"""Password hashes/sec per core for each configured scheme
+
+Uses the same cost settings as the app: BCRYPT_ROUNDS / ARGON2_TIME_COST,
+or PASSWORD_HASH_TARGET_MS calibration when that is set.
+
+    PASSWORD_HASH_TARGET_MS=250 python -m benchmarks.bench_hash_schemes --schemes bcrypt argon2
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+def hash_for(scheme, seconds, settings):
+    """Hashes per second one process completes with the given CryptContext settings"""
+    from passlib.context import CryptContext
+
+    context = CryptContext(schemes=[scheme], **{
+        key: value for key, value in settings.items() if key.startswith(f"{scheme}__")
+    })
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        context.hash("benchmark-password")
+        count += 1
+    return count / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--schemes", nargs="+", default=None)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    from utils.secure import PASSWORD_HASH_SCHEMES, calibrate_password_hashing, hash_settings
+
+    settings = calibrate_password_hashing() or hash_settings()
+    results = []
+    for scheme in args.schemes or PASSWORD_HASH_SCHEMES:
+        single = hash_for(scheme, args.seconds, settings)
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            parallel = sum(executor.map(
+                hash_for, [scheme] * args.workers, [args.seconds] * args.workers, [settings] * args.workers
+            ))
+        results.append({
+            "scheme": scheme,
+            "ms_per_hash": round(1000 / single, 1),
+            "hashes_per_sec_single": round(single, 2),
+            "hashes_per_sec_all_cores": round(parallel, 2),
+            "hashes_per_sec_per_core": round(parallel / args.workers, 2),
+            "workers": args.workers,
+        })
+    print(json.dumps({"settings": settings, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Cold import time of the app, with a budget
+
+Imports ``main`` in a fresh interpreter under ``-X importtime`` (repeated
+--runs times, best run kept) and prints the total plus the slowest
+modules. Exits non-zero when the total exceeds --budget-ms, or when
+``sqlalchemy.ext.asyncio`` (and with it greenlet) was imported although
+DB_ASYNC is unset, so CI can run it as a startup regression check; it
+never touches the database.
+
+    python -m benchmarks.bench_import_time --budget-ms 1500
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Modules the sync stack must not import; they belong to DB_ASYNC=true
+ASYNC_ONLY_MODULES = ("sqlalchemy.ext.asyncio", "greenlet")
+
+def import_profile(module):
+    """Per-module cumulative import time (microseconds) for one cold import"""
+    env = dict(os.environ, DATABASE_URL=os.environ.get("DATABASE_URL", "sqlite://"))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    profile = {}
+    for line in completed.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = int(cumulative)
+    return profile
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500")))
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    best = min((import_profile(args.module) for _ in range(args.runs)), key=lambda p: p.get(args.module, 0))
+    total_ms = best.get(args.module, 0) / 1000
+    async_stack = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+    leaked = [] if async_stack else [name for name in ASYNC_ONLY_MODULES if name in best]
+    # Only top-level packages, so "fastapi" is not listed again for each submodule
+    slowest = sorted(
+        ((name, us) for name, us in best.items() if "." not in name and name != args.module),
+        key=lambda item: item[1], reverse=True,
+    )[:args.top]
+    print(json.dumps({
+        "module": args.module,
+        "import_ms": round(total_ms, 1),
+        "budget_ms": args.budget_ms,
+        "within_budget": total_ms <= args.budget_ms,
+        "async_only_modules_imported": leaked,
+        "slowest": [{"module": name, "ms": round(us / 1000, 1)} for name, us in slowest],
+    }, indent=2))
+    if total_ms > args.budget_ms or leaked:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
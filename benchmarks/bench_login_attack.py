@@ -0,0 +1,84 @@
+"""CPU use of /users/login under a brute-force attack
+
+Sends --rate login attempts/sec with wrong passwords from --ips client
+addresses against a handful of real accounts, and reports process CPU
+(cores used), status codes and how many attempts reached bcrypt. With
+the login rate limiter almost everything should be answered with 429,
+and bcrypt should see no more than the configured budget.
+
+    python -m benchmarks.bench_login_attack --rate 10000 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from benchmarks.common import use_sqlite, seed_users
+
+def bcrypt_verifications():
+    from utils.metrics import stage_seconds
+
+    state = stage_seconds._values.get(("bcrypt.verify",))
+    return sum(state[:-1]) if state else 0
+
+async def run(args):
+    import httpx
+
+    use_sqlite()
+    from main import app
+    seed_users(args.accounts)
+
+    clients = [
+        httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app, client=(f"10.0.{i // 256}.{i % 256}", 40000)),
+            base_url="http://bench", timeout=60,
+        )
+        for i in range(args.ips)
+    ]
+    statuses = Counter()
+    in_flight = set()
+
+    async def attempt(n):
+        client = clients[n % len(clients)]
+        body = {"email": f"user{n % args.accounts}@bench.local", "password": "wrong-password"}
+        response = await client.post("/users/login", json=body)
+        statuses[response.status_code] += 1
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    interval = 1 / args.rate
+    sent = 0
+    while time.perf_counter() - wall_start < args.duration:
+        due = int((time.perf_counter() - wall_start) / interval)
+        while sent < due and len(in_flight) < args.max_in_flight:
+            task = asyncio.create_task(attempt(sent))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            sent += 1
+        await asyncio.sleep(0.001)
+    await asyncio.gather(*in_flight)
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    for client in clients:
+        await client.aclose()
+
+    print(json.dumps({
+        "target_rate": args.rate,
+        "achieved_rate": round(sent / wall, 1),
+        "attempts": sent,
+        "statuses": dict(statuses),
+        "bcrypt_verifications": bcrypt_verifications(),
+        "cpu_cores_used": round(cpu / wall, 2),
+        "cpu_us_per_attempt": round(cpu / max(sent, 1) * 1e6, 1),
+    }, indent=2))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=int, default=10000)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--ips", type=int, default=50)
+    parser.add_argument("--accounts", type=int, default=10)
+    parser.add_argument("--max-in-flight", type=int, default=2000)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Latency of cheap routes while /users/login is flooded
+
+Measures p99 of ``/health`` and ``GET /users/{id}`` on their own, then
+again while ``--concurrency`` clients hammer ``/users/login``. With the
+hash worker pool the two runs should be close; excess logins get a 503.
+The login rate limits are lifted (unless --keep-rate-limits), so the
+flood reaches bcrypt instead of measuring 429s. Flood clients wait out
+a 503's Retry-After, keeping the hash pool saturated without spinning;
+--ignore-retry-after retries at once, which in-process mostly measures
+the clients and the rejections sharing the event loop with the probes.
+
+    python -m benchmarks.bench_login_flood --concurrency 200 --probes 300
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from benchmarks.common import use_sqlite, seed_users, summarize, BENCH_PASSWORD
+
+async def probe(client, headers, count):
+    """Sequentially time /health and GET /users/{id}"""
+    health, get_user = [], []
+    for _ in range(count):
+        start = time.perf_counter()
+        await client.get("/health")
+        health.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await client.get("/users/1", headers=headers)
+        get_user.append(time.perf_counter() - start)
+    return {"health": summarize(health), "get_user": summarize(get_user)}
+
+async def flood(client, concurrency, stop, honor_retry_after=True):
+    """Fire logins from concurrency clients until stop is set"""
+    statuses = Counter()
+
+    async def worker(i):
+        body = {"email": f"user{i % 10}@bench.local", "password": BENCH_PASSWORD}
+        while not stop.is_set():
+            response = await client.post("/users/login", json=body)
+            statuses[response.status_code] += 1
+            # Rejected logins (429/503) complete without suspending; let the probes run
+            retry_after = response.headers.get("retry-after") if honor_retry_after else None
+            await asyncio.sleep(float(retry_after) if retry_after else 0)
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return dict(statuses)
+
+async def run(args):
+    import httpx
+
+    use_sqlite()
+    from main import app
+    seed_users(10)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        response = await client.post("/users/login", json={"email": "user0@bench.local", "password": BENCH_PASSWORD})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        idle = await probe(client, headers, args.probes)
+
+        stop = asyncio.Event()
+        flood_task = asyncio.create_task(flood(client, args.concurrency, stop, not args.ignore_retry_after))
+        await asyncio.sleep(0.5)  # let the flood saturate the hash pool
+        loaded = await probe(client, headers, args.probes)
+        stop.set()
+        login_statuses = await flood_task
+
+    print(json.dumps({
+        "concurrency": args.concurrency,
+        "honor_retry_after": not args.ignore_retry_after,
+        "idle": idle,
+        "under_login_flood": loaded,
+        "login_statuses": login_statuses,
+    }, indent=2))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--probes", type=int, default=300)
+    parser.add_argument("--keep-rate-limits", action="store_true")
+    parser.add_argument("--ignore-retry-after", action="store_true", help="Retry rejected logins at once")
+    args = parser.parse_args()
+    if not args.keep_rate_limits:
+        os.environ.setdefault("LOGIN_RATE_PER_IP", "1000000000")
+        os.environ.setdefault("LOGIN_RATE_PER_EMAIL", "1000000000")
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
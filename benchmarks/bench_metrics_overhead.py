@@ -0,0 +1,78 @@
+"""Per-request overhead of MetricsMiddleware
+
+Calls a trivial FastAPI route directly through ASGI (no sockets, no
+client) with and without the middleware and reports the difference.
+Exits non-zero when the overhead exceeds --budget-us.
+
+    python -m benchmarks.bench_metrics_overhead --requests 20000
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+def build_app(instrumented):
+    from fastapi import FastAPI
+    from middlewares.metrics import MetricsMiddleware
+
+    app = FastAPI()
+
+    @app.get("/ping/{item_id}")
+    async def ping(item_id: int):
+        return {"item_id": item_id}
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+async def time_requests(app, count):
+    """Average seconds per request for count direct ASGI calls"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/ping/1", "raw_path": b"/ping/1",
+        "root_path": "", "query_string": b"", "headers": [], "server": ("bench", 80),
+        "client": ("127.0.0.1", 1234),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(min(count, 1000)):  # warm up
+        await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(count):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / count
+
+async def run(args):
+    plain, instrumented = build_app(False), build_app(True)
+    # Interleave rounds so drift affects both variants alike; keep the best round
+    plain_times, instrumented_times = [], []
+    for _ in range(args.rounds):
+        plain_times.append(await time_requests(plain, args.requests))
+        instrumented_times.append(await time_requests(instrumented, args.requests))
+    overhead_us = (min(instrumented_times) - min(plain_times)) * 1e6
+    return {
+        "requests_per_round": args.requests,
+        "plain_us": round(min(plain_times) * 1e6, 2),
+        "instrumented_us": round(min(instrumented_times) * 1e6, 2),
+        "overhead_us": round(overhead_us, 2),
+        "budget_us": args.budget_us,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--budget-us", type=float, default=50.0)
+    args = parser.parse_args()
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["overhead_us"] <= args.budget_us else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""/users/search backends on a synthetic user table (1M users by default)
+
+Builds the in-process trigram index and, with --sql, a SQLite table with
+the same rows, then times ranked searches of several shapes on both.
+
+    python -m benchmarks.bench_search --users 1000000 --sql
+"""
+import argparse
+import json
+import random
+import resource
+import time
+from benchmarks.common import use_sqlite, summarize
+
+FIRST = ["james", "mary", "john", "patricia", "robert", "jennifer", "michael", "linda",
+         "william", "elizabeth", "david", "barbara", "richard", "susan", "joseph", "jessica"]
+LAST = ["smith", "johnson", "williams", "brown", "jones", "garcia", "miller", "davis",
+        "rodriguez", "martinez", "hernandez", "lopez", "gonzalez", "wilson", "anderson", "thomas"]
+DOMAINS = ["example.com", "mail.test", "corp.local", "bench.dev"]
+
+def synthetic_users(count, seed=7):
+    rng = random.Random(seed)
+    for user_id in range(1, count + 1):
+        first, last = rng.choice(FIRST), rng.choice(LAST)
+        tag = rng.randrange(36 ** 4)
+        yield (
+            user_id,
+            f"{first.title()} {last.title()}",
+            f"{first}.{last}{user_id}.{tag:x}@{rng.choice(DOMAINS)}",
+        )
+
+QUERIES = {
+    "common_prefix": "jennifer",
+    "common_substring": "mart",
+    "email_fragment": "williams42",
+    "rare": "zz9q",
+    "exact_email": None,  # filled in from the data
+}
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def time_queries(search, queries, repeat):
+    results = {}
+    for name, query in queries.items():
+        latencies, hits = [], 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            hits = len(search(query))
+            latencies.append(time.perf_counter() - start)
+        results[name] = {"query": query, "hits": hits, **summarize(latencies)}
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--sql", action="store_true", help="Also time the SQL LIKE backend on SQLite")
+    args = parser.parse_args()
+
+    from utils.search_index import TrigramIndex
+
+    queries = dict(QUERIES)
+    rows = list(synthetic_users(args.users))
+    queries["exact_email"] = rows[len(rows) // 2][2]
+
+    rss_before = max_rss_mb()
+    index = TrigramIndex()
+    start = time.perf_counter()
+    index.build(rows)
+    report = {
+        "users": args.users,
+        "trigram": {
+            "build_seconds": round(time.perf_counter() - start, 2),
+            "max_rss_growth_mb": round(max_rss_mb() - rss_before, 1),
+            "postings": len(index._postings),
+            "queries": time_queries(lambda q: index.search(q, args.limit)[0], queries, args.repeat),
+        },
+    }
+
+    if args.sql:
+        use_sqlite()
+        from config.database import create_tables, session
+        from models.models import User
+        from services.user_services import search_clauses
+
+        create_tables()
+        db = session()
+        start = time.perf_counter()
+        for offset in range(0, len(rows), 50000):
+            db.bulk_insert_mappings(User, [
+                {"id": user_id, "name": name, "email": email, "password": "x"}
+                for user_id, name, email in rows[offset:offset + 50000]
+            ])
+        db.commit()
+        load_seconds = time.perf_counter() - start
+
+        def sql_search(q):
+            where, order = search_clauses(q)
+            return db.query(User.id).filter(where).order_by(*order).limit(args.limit).all()
+
+        report["sql"] = {
+            "load_seconds": round(load_seconds, 2),
+            "queries": time_queries(sql_search, queries, max(1, args.repeat // 5)),
+        }
+        db.close()
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Serialization throughput: response_model path vs FAST_SERIALIZATION path
+
+The default path mirrors what FastAPI does for ``response_model=``:
+validate from ORM attributes, dump, ``jsonable_encoder``, then
+``JSONResponse``. The fast path is ``utils.serializers.fast_response``.
+
+    python -m benchmarks.bench_serialization
+"""
+import argparse
+import json
+import time
+from benchmarks.common import use_sqlite
+
+def default_page(page):
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from schemas.user import UserPage
+
+    model = UserPage.model_validate(page, from_attributes=True)
+    return JSONResponse(jsonable_encoder(model.model_dump(mode="json"))).body
+
+def fast_page(page):
+    from utils.serializers import fast_response, user_page_content
+
+    return fast_response(user_page_content, page).body
+
+def default_token(token):
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from schemas.user import Token
+
+    model = Token.model_validate(token, from_attributes=True)
+    return JSONResponse(jsonable_encoder(model.model_dump(mode="json"))).body
+
+def fast_token(token):
+    from utils.serializers import fast_response, token_content
+
+    return fast_response(token_content, token).body
+
+def throughput(func, payload, min_seconds):
+    """Calls per second of func(payload), run for at least min_seconds"""
+    func(payload)
+    calls, start = 0, time.perf_counter()
+    while True:
+        func(payload)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return calls / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    use_sqlite()
+    from models.models import User
+
+    results = []
+    for size in args.sizes:
+        users = [User(id=i, email=f"user{i}@bench.local", name=f"Bench User {i}") for i in range(1, size + 1)]
+        page = {"items": users, "next_cursor": None}
+        assert json.loads(default_page(page)) == json.loads(fast_page(page))
+        default_ops = throughput(default_page, page, args.seconds)
+        fast_ops = throughput(fast_page, page, args.seconds)
+        results.append({
+            "payload": f"UserPage[{size}]",
+            "default_users_per_sec": round(default_ops * size),
+            "fast_users_per_sec": round(fast_ops * size),
+            "speedup": round(fast_ops / default_ops, 2),
+        })
+
+    token = {"access_token": "x" * 160, "token_type": "bearer", "expires_in": 1800,
+             "user": User(id=1, email="user1@bench.local", name="Bench User 1")}
+    default_ops = throughput(default_token, token, args.seconds)
+    fast_ops = throughput(fast_token, token, args.seconds)
+    results.append({
+        "payload": "Token",
+        "default_per_sec": round(default_ops),
+        "fast_per_sec": round(fast_ops),
+        "speedup": round(fast_ops / default_ops, 2),
+    })
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
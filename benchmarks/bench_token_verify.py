@@ -0,0 +1,44 @@
+"""Tokens verified/sec: jwt.decode per request vs the shared TokenVerifier
+
+Both verify the same HS256 tokens (distinct tokens, so nothing is served
+from the token cache) on one core.
+
+    python -m benchmarks.bench_token_verify --tokens 10000
+"""
+import argparse
+import json
+import time
+from datetime import timedelta
+
+def throughput(verify, tokens, seconds):
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for token in tokens:
+            verify(token)
+        count += len(tokens)
+    return count / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=10000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    import jwt
+    from utils.tokens import ALGORITHM, issue_token, keyring, token_verifier
+
+    tokens = [issue_token({"sub": str(i)}, timedelta(hours=1)) for i in range(args.tokens)]
+    secret = keyring._secrets[keyring.active_kid]
+    assert token_verifier.verify(tokens[0]) == jwt.decode(tokens[0], secret, algorithms=[ALGORITHM])
+
+    pyjwt = throughput(lambda token: jwt.decode(token, secret, algorithms=[ALGORITHM]), tokens, args.seconds)
+    shared = throughput(token_verifier.verify, tokens, args.seconds)
+    print(json.dumps({
+        "token_bytes": len(tokens[0]),
+        "pyjwt_decode_per_sec": round(pyjwt),
+        "token_verifier_per_sec": round(shared),
+        "speedup": round(shared / pyjwt, 2),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Validations/sec of the register and login schemas, valid and invalid payloads
+
+Compares the current UserCreate/UserLogin (constraints run in pydantic-core)
+with copies of the previous schemas, whose Python @validator methods
+stripped and lowercased the fields, on one core.
+
+    python -m benchmarks.bench_validation --seconds 2 --min-speedup 1.0
+
+With --min-speedup the run fails (exit code 1) when the current schemas
+are slower than the legacy copies by more than that factor on any payload.
+"""
+import argparse
+import json
+import sys
+import time
+import warnings
+
+PAYLOADS = {
+    "register_valid": {"email": "  Jane.Doe@Example.COM ", "name": " Jane Doe ", "password": "correct-horse"},
+    "register_invalid": {"email": "jane@example.com", "name": " ", "password": "short"},
+    "login_valid": {"email": "Jane.Doe@Example.com ", "password": "correct-horse"},
+    "login_invalid": {"email": ["not", "a", "string"], "password": None},
+}
+
+def legacy_schemas():
+    """The v1-style schemas this benchmark measures against"""
+    from pydantic import BaseModel, Field, validator
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+
+        class UserCreate(BaseModel):
+            email: str = Field(...)
+            name: str = Field(..., min_length=2, max_length=50)
+            password: str = Field(..., min_length=6, max_length=100)
+
+            @validator('email')
+            def validate_email(cls, v):
+                if not v or not v.strip():
+                    raise ValueError('Email is required')
+                return v.lower().strip()
+
+            @validator('name')
+            def validate_name(cls, v):
+                if not v or not v.strip():
+                    raise ValueError('Name is required')
+                return v.strip()
+
+            @validator('password')
+            def validate_password(cls, v):
+                if not v or len(v) < 6:
+                    raise ValueError('Password must be at least 6 characters long')
+                return v
+
+        class UserLogin(BaseModel):
+            email: str = Field(...)
+            password: str = Field(...)
+
+            @validator('email')
+            def validate_email(cls, v):
+                return v.lower().strip() if v else None
+
+    return UserCreate, UserLogin
+
+def throughput(model, payload, seconds):
+    from pydantic import ValidationError
+
+    validate = model.model_validate
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for _ in range(1000):
+            try:
+                validate(payload)
+            except ValidationError:
+                pass
+        count += 1000
+    return count / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0, help="Per payload and schema")
+    parser.add_argument("--min-speedup", type=float, default=None, help="Fail below this current/legacy ratio")
+    args = parser.parse_args()
+
+    from schemas.user import UserCreate, UserLogin
+
+    LegacyCreate, LegacyLogin = legacy_schemas()
+    valid = PAYLOADS["register_valid"]
+    assert UserCreate.model_validate(valid).model_dump() == LegacyCreate.model_validate(valid).model_dump()
+
+    results = {}
+    for name, payload in PAYLOADS.items():
+        current, legacy = (UserCreate, LegacyCreate) if name.startswith("register") else (UserLogin, LegacyLogin)
+        before = throughput(legacy, payload, args.seconds)
+        after = throughput(current, payload, args.seconds)
+        results[name] = {
+            "legacy_per_sec": round(before),
+            "current_per_sec": round(after),
+            "speedup": round(after / before, 2),
+        }
+    print(json.dumps(results, indent=2))
+
+    if args.min_speedup is not None:
+        slow = [name for name, result in results.items() if result["speedup"] < args.min_speedup]
+        if slow:
+            print(f"Below {args.min_speedup}x: {', '.join(slow)}", file=sys.stderr)
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
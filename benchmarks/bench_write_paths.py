@@ -0,0 +1,72 @@
+"""SQL round-trips and latency of the user write endpoints
+
+Runs --requests registrations, updates and deletes through the app and
+reports, per endpoint, the statements executed per request (cursor
+executes, from the db.query stage) plus the commit, and latency. Run it
+on two revisions to compare write paths; duplicate registrations are
+included because they now fail on the INSERT instead of a lookup.
+
+    python -m benchmarks.bench_write_paths --requests 500
+"""
+import argparse
+import asyncio
+import json
+import time
+from benchmarks.common import use_sqlite, seed_users, summarize, BENCH_PASSWORD
+
+def statement_count():
+    from utils.metrics import stage_seconds
+
+    state = stage_seconds._values.get(("db.query",))
+    return sum(state[:-1]) if state else 0
+
+async def run(args):
+    import httpx
+
+    use_sqlite()
+    from main import app
+    # Regular accounts for updates, then one extra account per delete
+    seed_users(args.users + args.requests)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        response = await client.post("/users/login", json={"email": "user0@bench.local", "password": BENCH_PASSWORD})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        # Warm the auth caches so only the write itself is counted
+        await client.get("/users/1", headers=headers)
+
+        endpoints = {
+            "register": lambda i: client.post("/users/register", json={
+                "email": f"new{i}@bench.local", "name": f"New User {i}", "password": BENCH_PASSWORD}),
+            "register_duplicate": lambda i: client.post("/users/register", json={
+                "email": f"user{i % args.users}@bench.local", "name": "Duplicate", "password": BENCH_PASSWORD}),
+            "update": lambda i: client.put(f"/users/{i % args.users + 2}", headers=headers, json={
+                "email": f"user{i % args.users + 1}@bench.local", "name": f"Updated {i}"}),
+            "delete": lambda i: client.delete(f"/users/{args.users + i + 1}", headers=headers),
+        }
+
+        results = {}
+        for name, send in endpoints.items():
+            latencies, statuses = [], {}
+            before = statement_count()
+            for i in range(args.requests):
+                start = time.perf_counter()
+                response = await send(i)
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            results[name] = {
+                "statements_per_request": round((statement_count() - before) / args.requests, 2),
+                "statuses": statuses,
+                **summarize(latencies),
+            }
+
+    print(json.dumps({"requests": args.requests, "endpoints": results}, indent=2))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--users", type=int, default=1000)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Shared helpers for the benchmark scripts
+
+Run benchmarks from the repository root, e.g.::
+
+    python -m benchmarks.bench_login_flood
+
+They need the app requirements plus ``httpx``.
+"""
+import os
+import statistics
+import tempfile
+
+BENCH_PASSWORD = "benchmark-password"
+
+def use_sqlite(path=None):
+    """Point the app at a throwaway SQLite database (call before importing main)"""
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="user-api-bench-"), "bench.db")
+    # Concurrent writers wait for SQLite's single write lock instead of failing after 5s
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}?timeout=60"
+    return path
+
+def seed_users(count, password=BENCH_PASSWORD, start=0):
+    """Create the tables and insert count users sharing one precomputed password hash"""
+    from config.database import create_tables, session
+    from models.models import User
+    from utils.secure import hash_password
+
+    # httpx.ASGITransport does not run the app lifespan, so build the engines here
+    create_tables()
+    hashed = hash_password(password)
+    db = session()
+    try:
+        db.bulk_insert_mappings(User, [
+            {"email": f"user{i}@bench.local", "name": f"Bench User {i}", "password": hashed}
+            for i in range(start, start + count)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def summarize(latencies):
+    """Summarize latencies (seconds) as milliseconds"""
+    return {
+        "count": len(latencies),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
@@ -0,0 +1,199 @@
+"""Load test of the user API with JSON results and baseline comparison
+
+Seeds --users accounts, then drives each scenario (register, login,
+get_by_id, list, update, delete) with --concurrency clients, either
+in-process through httpx.ASGITransport or against a real uvicorn server
+(--target uvicorn). Reports RPS, p50/p95/p99 and error counts per scenario.
+
+    python -m benchmarks.load_test --output results.json
+    python -m benchmarks.load_test --baseline baseline.json --threshold 0.15
+
+With --baseline the run fails (exit code 1) when any scenario's RPS drops,
+or its p95 grows, by more than --threshold compared to the baseline file.
+Login rate limits are lifted for the run unless --keep-rate-limits is set.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from benchmarks.common import use_sqlite, seed_users, summarize, BENCH_PASSWORD
+
+SCENARIOS = ["register", "login", "get_by_id", "list", "update", "delete"]
+
+def request_for(scenario, i, args):
+    """(method, path, json body) of the i-th request of a scenario"""
+    if scenario == "register":
+        return "POST", "/users/register", {"email": f"new{i}@load.local", "name": f"Load User {i}", "password": BENCH_PASSWORD}
+    if scenario == "login":
+        return "POST", "/users/login", {"email": f"user{i % args.users}@bench.local", "password": BENCH_PASSWORD}
+    if scenario == "get_by_id":
+        return "GET", f"/users/{i % args.users + 1}", None
+    if scenario == "list":
+        return "GET", f"/users/?limit={args.page_size}&after={(i * args.page_size) % args.users}", None
+    if scenario == "update":
+        # Keeps the email so the seeded accounts stay usable, and no password,
+        # which would revoke the sessions (and the token) of the user
+        user = i % args.users
+        return "PUT", f"/users/{user + 1}", {"email": f"user{user}@bench.local", "name": f"Updated {i}"}
+    if scenario == "delete":
+        # Deletes only the extra accounts seeded after the regular ones
+        return "DELETE", f"/users/{args.users + i + 1}", None
+    raise ValueError(f"Unknown scenario {scenario}")
+
+async def drive(client, scenario, args, headers):
+    latencies = []
+    statuses = Counter()
+    remaining = iter(range(args.requests))
+
+    async def worker():
+        for i in remaining:
+            method, path, body = request_for(scenario, i, args)
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": args.requests,
+        "rps": round(args.requests / elapsed, 1),
+        "errors": sum(count for code, count in statuses.items() if code >= 400),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        **summarize(latencies),
+    }
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_uvicorn(args):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        env=os.environ.copy(),
+    )
+    return server, f"http://127.0.0.1:{port}"
+
+async def wait_until_up(client, timeout=30):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except Exception:
+            if time.monotonic() > deadline:
+                raise
+        await asyncio.sleep(0.2)
+
+async def run(args):
+    import httpx
+
+    # Enough extra accounts for the delete scenario to remove one per request
+    seed_users(args.users + (args.requests if "delete" in args.scenarios else 0))
+
+    server = None
+    if args.target == "uvicorn":
+        server, base_url = start_uvicorn(args)
+        transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=args.concurrency))
+    else:
+        from main import app
+
+        base_url = "http://bench"
+        transport = httpx.ASGITransport(app=app)
+
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60) as client:
+            if server is not None:
+                await wait_until_up(client)
+            response = await client.post("/users/login", json={"email": "user0@bench.local", "password": BENCH_PASSWORD})
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            results = {}
+            for scenario in args.scenarios:
+                results[scenario] = await drive(client, scenario, args, headers)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+    return results
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(results, baseline, threshold):
+    """Regressions of results against a baseline report, as messages"""
+    regressions = []
+    for scenario, current in results.items():
+        before = baseline.get("results", {}).get(scenario)
+        if not before:
+            continue
+        if current["rps"] < before["rps"] * (1 - threshold):
+            regressions.append(f"{scenario}: rps {current['rps']} < baseline {before['rps']} (-{threshold:.0%} allowed)")
+        if current["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(f"{scenario}: p95 {current['p95_ms']}ms > baseline {before['p95_ms']}ms (+{threshold:.0%} allowed)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--target", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (--target uvicorn)")
+    parser.add_argument("--output", help="Write the JSON report here as well as to stdout")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed regression as a fraction")
+    parser.add_argument("--keep-rate-limits", action="store_true")
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        use_sqlite()
+    if not args.keep_rate_limits:
+        os.environ.setdefault("LOGIN_RATE_PER_IP", "1000000000")
+        os.environ.setdefault("LOGIN_RATE_PER_EMAIL", "1000000000")
+
+    results = asyncio.run(run(args))
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "target": args.target,
+            "users": args.users,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline:
+            regressions = compare(results, json.load(baseline), args.threshold)
+        report["regressions"] = regressions
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            out.write(output + "\n")
+    if regressions:
+        print("\n".join(["Regressions:"] + regressions), file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.schema import CreateColumn
 from sqlalchemy.orm import sessionmaker
 import os
+import time
+import logging
 from urllib.parse import quote_plus
 from dotenv import load_dotenv
+from utils.metrics import registry, stage_seconds
+from utils.query_profiler import QUERY_PROFILING, query_profiler
+from config.routing import ReplicaSet, RoutingSession
 
 load_dotenv(dotenv_path="./env_files/.env")
 
@@ -14,23 +21,278 @@ DB_NAME = os.getenv("DB_NAME")
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "3306")
 # Create the database URL
-ENCODED_PASSWORD = quote_plus(DB_PASSWORD)
+ENCODED_PASSWORD = quote_plus(DB_PASSWORD or "")
 
-# Now use it in your DATABASE_URL
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{ENCODED_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Now use it in your DATABASE_URL (DATABASE_URL overrides, e.g. sqlite for local benchmarks)
+DATABASE_URL = os.getenv("DATABASE_URL") or f"mysql+pymysql://{DB_USER}:{ENCODED_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL is not set. Please check your environment variables.")     
 
-engine = create_engine(DATABASE_URL)
-session=sessionmaker(autoflush=False, autocommit=False, bind=engine)
+# Async stack (optional): DB_ASYNC=true serves the user routes from an AsyncSession
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+ASYNC_DRIVERS = {
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def to_async_url(url: str) -> str:
+    """Swap the sync driver in a database URL for its asyncio counterpart"""
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # below MySQL wait_timeout
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_SLOW_CHECKOUT_MS = float(os.getenv("DB_SLOW_CHECKOUT_MS", "100"))
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", str(DB_POOL_SIZE)))  # connections opened at startup
+
+logger = logging.getLogger(__name__)
+
+def pool_options(url: str) -> dict:
+    """Engine keyword arguments for the configured connection pool"""
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    # SQLite (file, memory or aiosqlite) keeps the dialect's default pool, whose
+    # singleton/static/null variants take no sizing arguments
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return options
+
+# Read replicas (optional): comma-separated URLs; reads go there, writes to the primary
+DB_REPLICA_URLS = [url.strip() for url in os.getenv("DB_REPLICA_URLS", "").split(",") if url.strip()]
+DB_REPLICA_STRATEGY = os.getenv("DB_REPLICA_STRATEGY", "round_robin")  # or least_connections
+DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "5"))
+
+# Engines are built by init_engines() from the app lifespan (or a CLI command),
+# never at import time; the session factories below are bound there.
+engine = None
+replica_engines = []
+replica_set = None
+async_engine = None
+session=sessionmaker(autoflush=False, autocommit=False, class_=RoutingSession)
+async_session = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_session = async_sessionmaker(autoflush=False, expire_on_commit=False)
 base=declarative_base()
 
+# Pool instrumentation, exported at /metrics
+pool_checkout_seconds = registry.histogram(
+    "db_pool_checkout_seconds", "Time spent waiting for a pooled primary connection"
+)
+pool_overflow_total = registry.counter(
+    "db_pool_overflow_total", "Connections opened beyond pool_size"
+)
+pool_invalidated_total = registry.counter(
+    "db_pool_invalidated_total", "Pooled connections discarded as broken or stale"
+)
+
+def pool_stat(name: str) -> int:
+    """Read a QueuePool counter (0 for pool classes that do not keep it)"""
+    method = getattr(engine.pool, name, None) if engine is not None else None
+    return method() if method is not None else 0
+
+registry.gauge("db_pool_in_use", "Connections checked out of the pool", function=lambda: pool_stat("checkedout"))
+registry.gauge("db_pool_idle", "Idle connections in the pool", function=lambda: pool_stat("checkedin"))
+registry.gauge("db_pool_overflow", "Overflow connections currently open", function=lambda: max(pool_stat("overflow"), 0))
+
+def timed_pool_class(url: str):
+    """
+    The dialect's default pool class, recording how long each checkout waits
+
+    Sessions check a connection out when their first statement runs, on the
+    engine RoutingSession picked for it, so timing Pool.connect() measures
+    the pool that is actually used without holding a connection early.
+    """
+    url = make_url(url)
+    pool_class = url.get_dialect().get_pool_class(url)
+
+    class TimedPool(pool_class):
+        def connect(self):
+            start = time.perf_counter()
+            connection = super().connect()
+            waited = time.perf_counter() - start
+            pool_checkout_seconds.observe(waited)
+            if waited * 1000 > DB_SLOW_CHECKOUT_MS:
+                logger.warning(
+                    "Slow DB connection checkout: %.1f ms (in use=%s, overflow=%s)",
+                    waited * 1000, pool_stat("checkedout"), pool_stat("overflow")
+                )
+            return connection
+
+    TimedPool.__name__ = f"Timed{pool_class.__name__}"
+    return TimedPool
+
+def _on_connect(dbapi_connection, connection_record):
+    if pool_stat("overflow") > 0:
+        pool_overflow_total.inc()
+
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    pool_invalidated_total.inc()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    stage_seconds.observe(elapsed, stage="db.query")
+    if QUERY_PROFILING:
+        query_profiler.record(statement, parameters, elapsed)
+
+def _instrument(sync_engine):
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+def init_engines():
+    """Create the primary, replica and async engines and bind the session factories"""
+    global engine, replica_engines, replica_set, async_engine
+    if engine is not None:
+        return engine
+
+    engine = create_engine(DATABASE_URL, poolclass=timed_pool_class(DATABASE_URL), **pool_options(DATABASE_URL))
+    event.listen(engine, "connect", _on_connect)
+    event.listen(engine, "invalidate", _on_invalidate)
+    _instrument(engine)
+
+    replica_engines = [create_engine(url, **pool_options(url)) for url in DB_REPLICA_URLS]
+    for replica in replica_engines:
+        _instrument(replica)
+    if replica_engines:
+        replica_set = ReplicaSet(
+            replica_engines,
+            strategy=DB_REPLICA_STRATEGY,
+            max_lag=DB_REPLICA_MAX_LAG,
+            check_interval=DB_REPLICA_CHECK_INTERVAL,
+        )
+    session.configure(primary=engine, replica_set=replica_set)
+
+    if DB_ASYNC:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL))
+        _instrument(async_engine.sync_engine)
+        async_session.configure(bind=async_engine)
+    return engine
+
+def _after_fork_in_child():
+    # A forked worker must not share the parent's pooled connections
+    sync_engines = [engine, *replica_engines, async_engine.sync_engine if async_engine is not None else None]
+    for sync_engine in sync_engines:
+        if sync_engine is not None:
+            sync_engine.dispose(close=False)
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+def warm_up_pool(connections: int = DB_POOL_WARMUP):
+    """Open pool connections ahead of the first requests"""
+    held = []
+    try:
+        for _ in range(min(connections, DB_POOL_SIZE)):
+            conn = engine.connect()
+            held.append(conn)
+            conn.exec_driver_sql("SELECT 1")
+    finally:
+        for conn in held:
+            conn.close()
+
+async def dispose_engines():
+    """Close every pooled connection (app shutdown)"""
+    global engine, replica_engines, replica_set, async_engine
+    if async_engine is not None:
+        await async_engine.dispose()
+    for sync_engine in [engine, *replica_engines]:
+        if sync_engine is not None:
+            sync_engine.dispose()
+    engine, replica_engines, replica_set, async_engine = None, [], None, None
+
+def create_tables():
+    """
+    Create missing tables, columns and indexes (python -m main create-tables)
+
+    Not run on app start. Safe to re-run after an upgrade: create_all()
+    skips existing tables, and upgrade_schema() adds what newer models
+    define on top of them.
+    """
+    import models.models  # noqa: F401 - registers the tables on base.metadata
+
+    bind = init_engines()
+    base.metadata.create_all(bind=bind)
+    upgrade_schema(bind)
+
+def upgrade_schema(bind):
+    """
+    Add model columns and indexes missing from existing tables
+
+    A new NOT NULL column needs a server_default (e.g. users.version) so
+    that the rows already in the table get a value.
+    """
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable and column.server_default is None:
+                    raise RuntimeError(f"Cannot add NOT NULL column {table.name}.{column.name} without a server_default")
+                ddl = CreateColumn(column).compile(dialect=bind.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE {bind.dialect.identifier_preparer.format_table(table)} ADD COLUMN {ddl}")
+                logger.warning("Added column %s.%s", table.name, column.name)
+            indexes = _index_names(conn, inspector, table.name)
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(conn)
+                    logger.warning("Created index %s", index.name)
+
+def _index_names(conn, inspector, table_name: str) -> set:
+    if conn.dialect.name == "sqlite":
+        # SQLite reflection skips expression indexes such as lower(name)
+        rows = conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?", (table_name,))
+        return {name for (name,) in rows}
+    return {index["name"] for index in inspector.get_indexes(table_name)}
+
+def release_connection(db):
+    """
+    Return a sync session's connection to the pool once a route is done with the database
+
+    Loaded objects stay readable (close() does not expire them), and the
+    session begins again if it is used afterwards. FastAPI validates the
+    result of a sync route in a threadpool thread, and get_db only closes
+    the session after the response is sent; a route returning ORM rows would
+    otherwise hold its connection while it waits for a thread, and a burst
+    larger than the pool leaves every thread waiting for a connection.
+    """
+    db.close()
+
 def get_db():
     db = session()
     try:
         yield db
-    except Exception as e:
-        print(f"An error occurred: {e}")
+    except Exception:
         db.rollback()
+        raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    if async_session is None:
+        raise RuntimeError("Async database is disabled. Set DB_ASYNC=true to enable it.")
+    async with async_session() as db:
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise
@@ -0,0 +1,131 @@
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, List, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+from utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+routed_statements_total = registry.counter(
+    "db_routed_statements_total", "Statements routed by RoutingSession", ("target",)
+)
+
+def replication_lag(engine: Engine) -> float:
+    """
+    Seconds a replica is behind its primary
+
+    Reads MySQL's replica status; engines that are not MySQL replicas
+    (e.g. a local SQLite copy) report no lag.
+    """
+    if engine.dialect.name != "mysql":
+        return 0.0
+    with engine.connect() as conn:
+        for statement, column in (
+            ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+            ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+        ):
+            try:
+                row = conn.execute(text(statement)).mappings().first()
+            except Exception:
+                continue
+            if row is None:
+                return 0.0
+            lag = row.get(column)
+            # NULL means replication is stopped
+            return float(lag) if lag is not None else float("inf")
+    return 0.0
+
+class ReplicaSet:
+    """
+    Read replicas with round-robin or least-connections selection
+
+    Replica lag is probed at most every check_interval seconds; replicas
+    lagging more than max_lag (or failing the probe) are skipped until
+    the next probe, and reads fall back to the primary when none is left.
+    """
+
+    def __init__(self, engines: List[Engine], strategy: str = "round_robin", max_lag: float = 5.0,
+                 check_interval: float = 5.0, lag_probe: Callable[[Engine], float] = replication_lag):
+        if strategy not in ("round_robin", "least_connections"):
+            raise ValueError("Replica strategy must be 'round_robin' or 'least_connections'")
+        self.engines = engines
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag_probe = lag_probe
+        self._healthy = list(engines)
+        self._counter = itertools.count()
+        self._checked_at = 0.0
+        self._probe_lock = threading.Lock()
+
+    def _refresh(self):
+        # Only one thread probes; the rest keep using the last known state
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return
+        if not self._probe_lock.acquire(blocking=False):
+            return
+        try:
+            healthy = []
+            for engine in self.engines:
+                try:
+                    lag = self.lag_probe(engine)
+                except Exception as e:
+                    logger.warning("Replica %s failed its lag probe: %s", engine.url.render_as_string(), e)
+                    continue
+                if lag <= self.max_lag:
+                    healthy.append(engine)
+                else:
+                    logger.warning("Replica %s is %.1fs behind; reading from primary", engine.url.render_as_string(), lag)
+            self._healthy = healthy
+            self._checked_at = time.monotonic()
+        finally:
+            self._probe_lock.release()
+
+    def choose(self) -> Optional[Engine]:
+        """Pick a replica for reads, or None to use the primary"""
+        self._refresh()
+        healthy = self._healthy
+        if not healthy:
+            return None
+        if self.strategy == "least_connections":
+            return min(healthy, key=lambda engine: getattr(engine.pool, "checkedout", lambda: 0)())
+        return healthy[next(self._counter) % len(healthy)]
+
+class RoutingSession(Session):
+    """
+    Session sending reads to a replica and writes to the primary
+
+    Without a replica set every statement simply goes to the primary.
+    The first write (flush, INSERT/UPDATE/DELETE or SELECT ... FOR UPDATE)
+    pins the session to the primary, so a request always reads its own
+    writes. Reads before that stick to one replica for the whole session.
+    """
+
+    def __init__(self, *args, primary: Optional[Engine] = None, replica_set: Optional[ReplicaSet] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.primary = primary
+        self.replica_set = replica_set
+        self._use_primary = False
+        self._replica = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.primary is None:
+            raise RuntimeError("Database engines are not initialized; call config.database.init_engines()")
+        if self.replica_set is None:
+            return self.primary
+        if not self._use_primary:
+            if self._flushing or isinstance(clause, UpdateBase) or getattr(clause, "_for_update_arg", None) is not None:
+                self._use_primary = True
+        if self._use_primary:
+            routed_statements_total.inc(target="primary")
+            return self.primary
+
+        if self._replica is None:
+            self._replica = self.replica_set.choose() or self.primary
+        routed_statements_total.inc(target="primary" if self._replica is self.primary else "replica")
+        return self._replica
@@ -2,5 +2,14 @@ from .user_controller import router as user_router, UserController
 
 __all__ = [
     "user_router",
-    "UserController"
-]
\ No newline at end of file
+    "UserController",
+    "async_user_router",
+    "AsyncUserController"
+]
+
+def __getattr__(name):
+    # The async controller pulls in the asyncio SQLAlchemy stack; load it only when asked for
+    if name in ("async_user_router", "AsyncUserController"):
+        from . import async_user_controller
+        return async_user_controller.router if name == "async_user_router" else async_user_controller.AsyncUserController
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,39 @@
+from typing import Any, Dict, List, Tuple
+from fastapi import APIRouter
+
+class ControllerRoutes:
+    """
+    Route table for a controller class
+
+    Decorating methods with router.get/post while the class body runs would
+    register the plain functions, and FastAPI would then ask for `self` as
+    a query parameter. The decorators here only record the route; bind()
+    adds the methods of a controller instance, bound, in definition order.
+    """
+
+    def __init__(self):
+        self._routes: List[Tuple[str, str, str, Dict[str, Any]]] = []
+
+    def _record(self, method: str, path: str, options: Dict[str, Any]):
+        def record(func):
+            self._routes.append((func.__name__, method, path, options))
+            return func
+        return record
+
+    def get(self, path: str, **options):
+        return self._record("GET", path, options)
+
+    def post(self, path: str, **options):
+        return self._record("POST", path, options)
+
+    def put(self, path: str, **options):
+        return self._record("PUT", path, options)
+
+    def delete(self, path: str, **options):
+        return self._record("DELETE", path, options)
+
+    def bind(self, controller, router: APIRouter) -> APIRouter:
+        """Add every recorded route of controller to router"""
+        for name, method, path, options in self._routes:
+            router.add_api_route(path, getattr(controller, name), methods=[method], **options)
+        return router
@@ -1,47 +1,152 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from config.database import get_db  # Fixed: was config.db
+from config.database import get_db, release_connection  # Fixed: was config.db
 from models.models import User
-from schemas.user import UserCreate, UserLogin, UserResponse, Token
+from schemas.user import UserCreate, UserUpdate, UserLogin, UserResponse, UserPage, UserSearchPage, UserBatch, UserBatchRequest, RefreshRequest, Token, BulkImportResult
 from services.user_services import UserService
+from services.bulk_import import BulkImporter, BULK_IMPORT_BATCH_SIZE
 from middlewares.auth import get_current_user
-from typing import List
+from middlewares.rate_limit import login_rate_limiter
+from utils.serializers import FAST_SERIALIZATION, fast_response, token_content, user_batch_content, user_content, user_page_content, user_search_content
+from utils.etag import user_etag, page_etag, etag_matches, not_modified
+from controllers.routes import ControllerRoutes
+from typing import Optional
 
 router = APIRouter()
+routes = ControllerRoutes()
 
 class UserController:
     def __init__(self):
         self.user_service = UserService()
 
-    @router.post("/register", response_model=Token, status_code=201)
-    def register(self, user: UserCreate, db: Session = Depends(get_db)):
+    @routes.post("/register", response_model=Token, status_code=201)
+    async def register(self, user: UserCreate, db: Session = Depends(get_db)):
         """Register a new user"""
-        return self.user_service.create_user(user, db)
+        token = await self.user_service.create_user_async(user, db)
+        if FAST_SERIALIZATION:
+            return fast_response(token_content, token, status_code=201)
+        return token
 
-    @router.post("/login", response_model=Token)
-    def login(self, credentials: UserLogin, db: Session = Depends(get_db)):
+    @routes.post("/login", response_model=Token, dependencies=[Depends(login_rate_limiter)])
+    async def login(self, credentials: UserLogin, db: Session = Depends(get_db)):
         """User login"""
-        return self.user_service.authenticate_user(credentials, db)
+        token = await self.user_service.authenticate_user_async(credentials, db)
+        if FAST_SERIALIZATION:
+            return fast_response(token_content, token)
+        return token
 
-    @router.get("/", response_model=List[UserResponse])
-    def get_users(self, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-        """Get all users"""
-        return self.user_service.get_all_users(db)
+    @routes.post("/bulk", response_model=BulkImportResult)
+    async def bulk_import(
+        self,
+        request: Request,
+        batch_size: int = Query(BULK_IMPORT_BATCH_SIZE, ge=1, le=10000),
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+    ):
+        """Import users from a CSV (text/csv) or NDJSON request body"""
+        fmt = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+        importer = BulkImporter(fmt, batch_size)
+        await importer.import_stream(request.stream(), db)
+        return importer.summary()
 
-    @router.get("/{user_id}", response_model=UserResponse)
-    def get_user(self, user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    @routes.post("/refresh", response_model=Token)
+    def refresh(self, body: RefreshRequest, db: Session = Depends(get_db)):
+        """Exchange a refresh token for a new access token and refresh token"""
+        token = self.user_service.refresh_session(body.refresh_token, db)
+        if FAST_SERIALIZATION:
+            return fast_response(token_content, token)
+        return token
+
+    @routes.post("/batch", response_model=UserBatch)
+    def get_users_batch(self, body: UserBatchRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+        """Get many users by id in one request; unknown ids are listed in `missing`"""
+        batch = self.user_service.get_users_by_ids(body.ids, db)
+        release_connection(db)
+        if FAST_SERIALIZATION:
+            return fast_response(user_batch_content, batch)
+        return batch
+
+    @routes.get("/", response_model=UserPage)
+    def get_users(
+        self,
+        request: Request,
+        response: Response,
+        limit: int = Query(100, ge=1, le=1000),
+        after: Optional[int] = Query(None, description="Return users with id greater than this cursor"),
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+    ):
+        """Get a page of users ordered by id"""
+        if request.headers.get("if-none-match"):
+            # Answer polling clients from the (id, version) watermark alone
+            etag = page_etag(self.user_service.get_users_page_versions(db, limit, after), limit, after)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+        page = self.user_service.get_users_page(db, limit, after)
+        release_connection(db)
+        etag = page_etag(page, limit, after)
+        if FAST_SERIALIZATION:
+            result = fast_response(user_page_content, page)
+            result.headers["ETag"] = etag
+            return result
+        response.headers["ETag"] = etag
+        return page
+
+    @routes.get("/search", response_model=UserSearchPage)
+    def search_users(
+        self,
+        q: str = Query(..., min_length=1, max_length=100, description="Prefix of a name or email; also a substring with USER_SEARCH_BACKEND=trigram"),
+        limit: int = Query(20, ge=1, le=100),
+        offset: int = Query(0, ge=0, le=10000),
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+    ):
+        """Search users by name or email, best matches first"""
+        page = self.user_service.search_users(db, q, limit, offset)
+        release_connection(db)
+        if FAST_SERIALIZATION:
+            return fast_response(user_search_content, page)
+        return page
+
+    @routes.get("/export")
+    def export_users(self, current_user: User = Depends(get_current_user)):
+        """Stream all users as NDJSON"""
+        return StreamingResponse(
+            self.user_service.export_users_ndjson(),
+            media_type="application/x-ndjson"
+        )
+
+    @routes.get("/{user_id}", response_model=UserResponse)
+    def get_user(self, user_id: int, request: Request, response: Response, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
         """Get user by ID"""
-        return self.user_service.get_user_by_id(user_id, db)
+        if request.headers.get("if-none-match"):
+            etag = user_etag(user_id, self.user_service.get_user_version(user_id, db))
+            if etag_matches(request, etag):
+                return not_modified(etag)
+        user = self.user_service.get_user_by_id(user_id, db)
+        release_connection(db)
+        etag = user_etag(user.id, user.version)
+        if FAST_SERIALIZATION:
+            result = fast_response(user_content, user)
+            result.headers["ETag"] = etag
+            return result
+        response.headers["ETag"] = etag
+        return user
 
-    @router.put("/{user_id}", response_model=UserResponse)
-    def update_user(self, user_id: int, user_data: UserCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    @routes.put("/{user_id}", response_model=UserResponse)
+    def update_user(self, user_id: int, user_data: UserUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
         """Update user"""
-        return self.user_service.update_user(user_id, user_data, db)
+        user = self.user_service.update_user(user_id, user_data, db)
+        if FAST_SERIALIZATION:
+            return fast_response(user_content, user)
+        return user
 
-    @router.delete("/{user_id}")
+    @routes.delete("/{user_id}")
     def delete_user(self, user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
         """Delete user"""
         return self.user_service.delete_user(user_id, db)
 
-# Create controller instance
-user_controller = UserController()
\ No newline at end of file
+# Create controller instance and register its routes
+user_controller = UserController()
+routes.bind(user_controller, router)
@@ -1,17 +1,69 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from config.database import engine, base
-from controllers.user_controller import router as user_router
+from fastapi.responses import PlainTextResponse
+from config.database import DB_ASYNC, init_engines, warm_up_pool, dispose_engines
+from middlewares.metrics import MetricsMiddleware, instrument_serialization
+from middlewares.query_profiling import QueryProfilingMiddleware
+from services.bulk_import import shutdown_hash_executor
+from services.event_bus import event_bus
+from services.session_services import session_service
+from services.user_services import UserService, shutdown_rehash_store_executor
+from utils.broadcast import worker_broadcast
+from utils.hash_pool import hash_pool
+from utils.metrics import registry
+from utils.query_profiler import QUERY_PROFILING, query_profiler
+from utils.search_index import USER_SEARCH_BACKEND
+from utils.secure import calibrate_password_hashing, warm_up_password_hashing
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Engines and password hashing are set up here rather than at import time,
+    # so importing the app (tests, CLI, worker fork) stays cheap.
+    # Tables are not created on start: run `python -m main create-tables`.
+    init_engines()
+    warm_up_pool()
+    if USER_SEARCH_BACKEND == "trigram":
+        UserService().rebuild_search_index()
+    # Picks bcrypt rounds / argon2 cost for PASSWORD_HASH_TARGET_MS on this machine;
+    # under `python -m main serve` the parent already did and left them in the environment
+    calibrate_password_hashing()
+    warm_up_password_hashing()
+    await event_bus.start()
+    # Cache invalidations from sibling workers (python -m main serve); no-op otherwise
+    worker_broadcast.start()
+    # Revoked sessions are loaded before the first request is verified
+    await session_service.start()
+    yield
+    await session_service.stop()
+    worker_broadcast.stop()
+    # Deliver queued user events before the engines go away
+    await event_bus.drain()
+    hash_pool.shutdown(wait=False)
+    shutdown_rehash_store_executor()
+    shutdown_hash_executor()
+    await dispose_engines()
 
 app = FastAPI(
     title="User Management API",
     description="FastAPI application for user authentication and management",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Create database tables
-base.metadata.create_all(bind=engine)
+# Per-route latency/in-flight metrics and serialization timing, exported at /metrics
+app.add_middleware(MetricsMiddleware)
+instrument_serialization()
+# Opt-in SQL statement counts per request (Server-Timing header, /debug/queries)
+if QUERY_PROFILING:
+    app.add_middleware(QueryProfilingMiddleware)
 
 # Include routers
+# DB_ASYNC=true serves the same routes from the async engine
+if DB_ASYNC:
+    from controllers.async_user_controller import router as user_router
+else:
+    from controllers.user_controller import router as user_router
 app.include_router(user_router, prefix="/users", tags=["User Management"])
 
 @app.get("/")
@@ -26,5 +78,156 @@ def root():
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+if QUERY_PROFILING:
+    @app.get("/debug/queries")
+    def debug_queries():
+        """Per-route SQL statement counts, repeated statements and recent slow queries"""
+        return query_profiler.report()
+
+def import_users(path: str, fmt: str, batch_size: int):
+    """Bulk import users from a CSV/NDJSON file ("-" reads stdin)"""
+    import json
+    import sys
+    from config.database import session
+    from services.bulk_import import BulkImporter
+
+    init_engines()
+    if fmt is None:
+        fmt = "csv" if path.endswith(".csv") else "ndjson"
+    importer = BulkImporter(fmt, batch_size)
+    db = session()
+    try:
+        if path == "-":
+            importer.import_lines(sys.stdin, db)
+        else:
+            with open(path, encoding="utf-8") as lines:
+                importer.import_lines(lines, db)
+    finally:
+        db.close()
+        shutdown_hash_executor()
+    report = importer.summary()
+    report["failures"] = [row for row in report.pop("results") if row["status"] != "created"]
+    print(json.dumps(report, indent=2))
+
+def serve(host: str, port: int, workers: int, graceful_timeout: float):
+    """
+    Serve the app from `workers` forked uvicorn processes sharing one socket
+
+    The app and password hashing are loaded and calibrated once here and
+    shared copy-on-write (the hash cost also through the environment);
+    each worker builds its own engine pools in the lifespan and joins the cache
+    invalidation broadcast. SIGTERM/SIGINT drains every worker for up to
+    graceful_timeout seconds before stragglers are killed; a worker that exits
+    on its own is replaced.
+    """
+    import logging
+    import shutil
+    import signal
+    import socket
+    import tempfile
+    import time
+    import uvicorn
+
+    logger = logging.getLogger("main.serve")
+    config = uvicorn.Config(app, timeout_graceful_shutdown=graceful_timeout)
+    listener = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(config.backlog)
+    worker_broadcast.directory = tempfile.mkdtemp(prefix="user-api-workers-")
+    # Calibrate once here: workers timing hashes side by side would all measure
+    # a loaded machine and pick a lower cost
+    calibrate_password_hashing()
+    warm_up_password_hashing()
+
+    children = {}   # pid -> start time
+    deadline = None
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            # uvicorn installs its own handlers: SIGTERM means finish in-flight requests
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            status = 0
+            try:
+                uvicorn.Server(config).run(sockets=[listener])
+            except BaseException:
+                logger.exception("Worker %d crashed", os.getpid())
+                status = 1
+            os._exit(status)
+        children[pid] = time.monotonic()
+
+    def signal_children(signum):
+        for pid in children:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def shutdown(signum, frame):
+        nonlocal deadline
+        if deadline is None:
+            deadline = time.monotonic() + graceful_timeout
+            signal_children(signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    for _ in range(workers):
+        spawn()
+    logger.warning("Serving on %s:%d with %d workers", host, port, workers)
+    try:
+        while children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                if deadline is not None and time.monotonic() > deadline:
+                    signal_children(signal.SIGKILL)
+                time.sleep(0.1)
+                continue
+            started = children.pop(pid, None)
+            if started is not None and deadline is None:
+                logger.warning("Worker %d exited (%d); starting a replacement", pid, os.waitstatus_to_exitcode(status))
+                if time.monotonic() - started < 1:
+                    time.sleep(1)   # don't spin on a worker that fails at startup
+                spawn()
+    finally:
+        listener.close()
+        shutil.rmtree(worker_broadcast.directory, ignore_errors=True)
+
+def cli():
+    """Command line entry point: python -m main <command>"""
+    import argparse
+    from services.bulk_import import BULK_IMPORT_BATCH_SIZE
+
+    parser = argparse.ArgumentParser(prog="python -m main", description=app.description)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import-users", help="Bulk import users from a CSV or NDJSON file")
+    import_parser.add_argument("path", help="CSV/NDJSON file, or - for stdin")
+    import_parser.add_argument("--format", choices=["csv", "ndjson"], default=None)
+    import_parser.add_argument("--batch-size", type=int, default=BULK_IMPORT_BATCH_SIZE)
+
+    commands.add_parser("create-tables", help="Create missing tables, columns and indexes (run before first start and after upgrades)")
+
+    serve_parser = commands.add_parser("serve", help="Serve the API from several worker processes")
+    serve_parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    serve_parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    serve_parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_WORKERS", "0")) or os.cpu_count() or 1)
+    serve_parser.add_argument("--graceful-timeout", type=float, default=30.0, help="Seconds to drain in-flight requests")
+
+    args = parser.parse_args()
+    if args.command == "import-users":
+        import_users(args.path, args.format, args.batch_size)
+    elif args.command == "create-tables":
+        from config.database import create_tables
 
+        create_tables()
+    elif args.command == "serve":
+        serve(args.host, args.port, args.workers, args.graceful_timeout)
 
+if __name__ == "__main__":
+    cli()
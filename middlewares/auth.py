@@ -1,25 +1,31 @@
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 import jwt
-import os
-from datetime import datetime
-from config.database import get_db
+import time
+from typing import TYPE_CHECKING, Optional
+from config.database import get_db, get_async_db, release_connection
 from models.models import User
+from schemas.user import UserSnapshot
+from utils.cache import token_cache, user_cache
+from utils.metrics import timed
+from utils.revocation import revoked_sessions
+from utils.tokens import token_verifier
+
+if TYPE_CHECKING:
+    # Annotation only: importing sqlalchemy.ext.asyncio needs greenlet, which only DB_ASYNC=true requires
+    from sqlalchemy.ext.asyncio import AsyncSession
 
 # Security scheme for bearer token
 security = HTTPBearer()
 
-# JWT Configuration
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
-ALGORITHM = "HS256"
-
 class AuthMiddleware:
     """Authentication middleware class"""
     
     def __init__(self):
-        self.secret_key = SECRET_KEY
-        self.algorithm = ALGORITHM
+        self.verifier = token_verifier
+        self.revocations = revoked_sessions
 
     def verify_token(self, credentials: HTTPAuthorizationCredentials = Depends(security)):
         """
@@ -29,22 +35,22 @@ class AuthMiddleware:
             credentials: Bearer token from Authorization header
             
         Returns:
-            str: Email extracted from token
+            str: Subject extracted from token (the user id; an email in older tokens)
             
         Raises:
-            HTTPException: If token is invalid or expired
+            HTTPException: If token is invalid, expired or its session was revoked
         """
         try:
-            # Decode JWT token
-            payload = jwt.decode(
-                credentials.credentials, 
-                self.secret_key, 
-                algorithms=[self.algorithm]
-            )
+            # Reuse claims of a token that was already verified, else decode it
+            payload = token_cache.get_claims(credentials.credentials)
+            if payload is None:
+                with timed("auth.decode"):
+                    payload = self.verifier.verify(credentials.credentials)
+                token_cache.set_claims(credentials.credentials, payload)
             
-            # Extract email from token payload
-            email: str = payload.get("sub")
-            if email is None:
+            # Extract subject from token payload
+            subject = payload.get("sub")
+            if subject is None:
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Could not validate credentials",
@@ -53,15 +59,27 @@ class AuthMiddleware:
             
             # Check token expiration
             exp = payload.get("exp")
-            if exp is None or datetime.timezone.utc().timestamp() > exp:
+            if exp is None or time.time() > exp:
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Token has expired",
                     headers={"WWW-Authenticate": "Bearer"},
                 )
             
-            return email
+            # Check the session was not revoked (in memory, no DB access);
+            # tokens issued before sessions existed carry no sid
+            sid = payload.get("sid")
+            if sid is not None and sid in self.revocations:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Token has been revoked",
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
             
+            return str(subject)
+            
+        except HTTPException:
+            raise
         except jwt.ExpiredSignatureError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -81,30 +99,108 @@ class AuthMiddleware:
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-    def get_current_user(self, email: str = Depends(verify_token), db: Session = Depends(get_db)):
+    def lookup_user(self, subject: str, db: Session) -> Optional[UserSnapshot]:
+        """
+        Snapshot of a token's user from the user cache, else the database
+        
+        Tokens carry the user id, so a miss is a primary-key lookup. Tokens
+        issued before that carry the email and are looked up by it until
+        they expire.
+        """
+        if subject.isdigit():
+            user = user_cache.get_by_id(int(subject))
+            if user is None:
+                db_user = db.get(User, int(subject))
+                user = user_cache.set(db_user) if db_user else None
+                # The route handler still has to wait for a threadpool thread
+                release_connection(db)
+            return user
+        user = user_cache.get(subject)
+        if user is None:
+            db_user = db.query(User).filter(User.email == subject).first()
+            user = user_cache.set(db_user) if db_user else None
+            release_connection(db)
+        return user
+
+    async def lookup_user_async(self, subject: str, db: "AsyncSession") -> Optional[UserSnapshot]:
+        """lookup_user on an AsyncSession"""
+        if subject.isdigit():
+            user = user_cache.get_by_id(int(subject))
+            if user is None:
+                db_user = await db.get(User, int(subject))
+                user = user_cache.set(db_user) if db_user else None
+            return user
+        user = user_cache.get(subject)
+        if user is None:
+            result = await db.execute(select(User).where(User.email == subject))
+            db_user = result.scalar_one_or_none()
+            user = user_cache.set(db_user) if db_user else None
+        return user
+
+    def get_current_user(self, subject: str, db: Session):
         """
         Get current authenticated user middleware
         
         Args:
-            email: Email extracted from JWT token
+            subject: User id (or email) extracted from JWT token
             db: Database session
             
         Returns:
-            User: Current authenticated user object
+            UserSnapshot: Current authenticated user (id, email, name, is_active)
             
         Raises:
             HTTPException: If user not found or inactive
         """
-        user = db.query(User).filter(User.email == email).first()
+        user = self.lookup_user(subject, db)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found"
+            )
+        
+        # Check if user is active
+        if not user.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User account is inactive"
+            )
+        
+        return user
+
+    async def verify_token_async(self, credentials: HTTPAuthorizationCredentials = Depends(security)):
+        """
+        Async wrapper around verify_token so async routes never wait on the threadpool
+        
+        Args:
+            credentials: Bearer token from Authorization header
+            
+        Returns:
+            str: Subject extracted from token
+        """
+        return self.verify_token(credentials)
+
+    async def get_current_user_async(self, subject: str, db: "AsyncSession"):
+        """
+        Get current authenticated user using the async database session
         
+        Args:
+            subject: User id (or email) extracted from JWT token
+            db: Async database session
+            
+        Returns:
+            UserSnapshot: Current authenticated user (id, email, name, is_active)
+            
+        Raises:
+            HTTPException: If user not found or inactive
+        """
+        user = await self.lookup_user_async(subject, db)
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User not found"
             )
         
-        # Check if user is active (if you have is_active field)
-        if hasattr(user, 'is_active') and not user.is_active:
+        if not user.is_active:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User account is inactive"
@@ -162,15 +258,13 @@ class AuthMiddleware:
             db: Database session
             
         Returns:
-            User | None: Current user if authenticated, None otherwise
+            UserSnapshot | None: Current user if authenticated, None otherwise
         """
         if credentials is None:
             return None
         
         try:
-            email = self.verify_token(credentials)
-            user = db.query(User).filter(User.email == email).first()
-            return user
+            return self.lookup_user(self.verify_token(credentials), db)
         except HTTPException:
             return None
 
@@ -179,7 +273,16 @@ auth_middleware = AuthMiddleware()
 
 # Export dependency functions for easy import
 verify_token = auth_middleware.verify_token
-get_current_user = auth_middleware.get_current_user
+verify_token_async = auth_middleware.verify_token_async
+
+# Dependencies that depend on other methods are module-level functions: a
+# Depends() on a method inside the class body sees the unbound function,
+# and FastAPI would ask for `self` as a query parameter
+def get_current_user(subject: str = Depends(verify_token), db: Session = Depends(get_db)) -> UserSnapshot:
+    return auth_middleware.get_current_user(subject, db)
+
+async def get_current_user_async(subject: str = Depends(verify_token_async), db: "AsyncSession" = Depends(get_async_db)) -> UserSnapshot:
+    return await auth_middleware.get_current_user_async(subject, db)
 # admin_required = auth_middleware.admin_required
 optional_auth = auth_middleware.optional_auth
 
@@ -0,0 +1,69 @@
+from time import perf_counter
+import fastapi.routing
+from utils.metrics import registry, timed
+
+# Request metrics
+requests_total = registry.counter(
+    "http_requests_total", "HTTP requests handled", ("method", "route", "status")
+)
+request_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+)
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route latency, status and in-flight counts
+
+    Routes are labelled by their path template (``/users/{user_id}``), never
+    the raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        requests_in_flight.inc()
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = perf_counter() - start
+            requests_in_flight.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            request_seconds.observe(elapsed, method=method, route=path)
+            requests_total.inc(method=method, route=path, status=status_code)
+
+def instrument_serialization():
+    """
+    Time FastAPI's response_model validation and encoding as the "serialize" stage
+
+    FastAPI has no hook around serialization, so this wraps
+    fastapi.routing.serialize_response once at startup.
+    """
+    original = fastapi.routing.serialize_response
+    if getattr(original, "_timed", False):
+        return
+
+    async def serialize_response(*args, **kwargs):
+        with timed("serialize"):
+            return await original(*args, **kwargs)
+
+    serialize_response._timed = True
+    fastapi.routing.serialize_response = serialize_response
@@ -0,0 +1,32 @@
+from utils.query_profiler import query_profiler
+
+class QueryProfilingMiddleware:
+    """
+    Pure ASGI middleware profiling the SQL each request runs (QUERY_PROFILING=true)
+
+    Adds a ``Server-Timing: db;dur=<ms>;desc="<n> queries"`` header and
+    folds every request into the /debug/queries report, by route template.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = query_profiler.start()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", profile.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            query_profiler.finish(f"{scope['method']} {route}", profile)
@@ -0,0 +1,107 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from fastapi import HTTPException, Request, status
+from schemas.user import UserLogin
+from utils.metrics import registry
+
+# Login rate limit configuration
+LOGIN_RATE_PER_IP = float(os.getenv("LOGIN_RATE_PER_IP", "20"))          # attempts per window
+LOGIN_RATE_PER_EMAIL = float(os.getenv("LOGIN_RATE_PER_EMAIL", "5"))
+LOGIN_RATE_WINDOW = float(os.getenv("LOGIN_RATE_WINDOW", "60"))          # seconds
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+login_rejections_total = registry.counter(
+    "login_rate_limited_total", "Login attempts rejected before DB/bcrypt work", ("key",)
+)
+
+class RateLimitStore:
+    """
+    Token bucket store interface
+
+    ``consume`` takes one token from the bucket for key and returns
+    (allowed, seconds until a token is available). A shared store
+    (e.g. Redis with a Lua script) can implement the same call.
+    """
+
+    def consume(self, key: str, capacity: float, refill_per_second: float) -> Tuple[bool, float]:
+        raise NotImplementedError
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """Per-process token buckets with LRU eviction of idle keys"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()  # key -> [tokens, updated_at]
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_per_second):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [capacity, now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * refill_per_second)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True, 0.0
+            return False, (1 - bucket[0]) / refill_per_second
+
+    def __len__(self):
+        return len(self._buckets)
+
+class LoginRateLimiter:
+    """
+    Brute-force guard for /users/login
+
+    Runs as a dependency, so an over-limit client is rejected with 429 and
+    Retry-After before any DB lookup or bcrypt work. Buckets are kept per
+    client IP and per normalized email, which covers one IP spraying many
+    accounts as well as many IPs hammering a single account.
+    """
+
+    def __init__(self, store: Optional[RateLimitStore] = None,
+                 per_ip: float = LOGIN_RATE_PER_IP, per_email: float = LOGIN_RATE_PER_EMAIL,
+                 window: float = LOGIN_RATE_WINDOW):
+        self.store = store or InMemoryRateLimitStore()
+        self.per_ip = per_ip
+        self.per_email = per_email
+        self.window = window
+
+    def check(self, client_ip: str, email: Optional[str]):
+        """Consume one attempt for ip and email; raise 429 if either is exhausted"""
+        checks = [("ip", f"login:ip:{client_ip}", self.per_ip)]
+        if email:
+            checks.append(("email", f"login:email:{email}", self.per_email))
+
+        for label, key, limit in checks:
+            allowed, retry_after = self.store.consume(key, limit, limit / self.window)
+            if not allowed:
+                login_rejections_total.inc(key=label)
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many login attempts, please retry later",
+                    headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+                )
+
+    async def __call__(self, request: Request):
+        """Dependency form; declare it before the DB session so rejects never touch the pool"""
+        try:
+            body = await request.json()
+            email = UserLogin.model_validate(body).email if isinstance(body, dict) else None
+        except ValueError:
+            email = None  # malformed bodies are still limited per IP and rejected by validation
+        client_ip = request.client.host if request.client else "unknown"
+        self.check(client_ip, email)
+
+# Create limiter instance
+login_rate_limiter = LoginRateLimiter()
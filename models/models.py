@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text, func
 from config.database import base
 
 class User(base):
@@ -7,3 +7,35 @@ class User(base):
     email = Column(String(255), unique=True, index=True)
     name = Column(String(255), index=True)
     password = Column(String(255))
+    # Bumped on every update; used for ETags and conditional GETs
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    __table_args__ = (
+        # Case-insensitive name prefix search (search_clauses) as an index range scan
+        Index("ix_users_name_lower", func.lower(name)),
+    )
+
+class UserEvent(base):
+    """Outbox row for a user change, written in the same transaction as the change"""
+    __tablename__ = 'user_events'
+    id = Column(Integer, primary_key=True)
+    event_type = Column(String(50), nullable=False)
+    user_id = Column(Integer, nullable=False, index=True)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    # NULL until a sink has accepted the event
+    dispatched_at = Column(DateTime, nullable=True, index=True)
+
+class RefreshToken(base):
+    """One refresh token of a login session; each refresh replaces it with a new one"""
+    __tablename__ = 'refresh_tokens'
+    id = Column(Integer, primary_key=True)
+    # SHA-256 of the token: the token itself only ever goes to the client
+    token_hash = Column(String(64), unique=True, nullable=False)
+    session_id = Column(String(32), nullable=False, index=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    # Set when the token is exchanged; presenting it again revokes the session
+    used_at = Column(DateTime, nullable=True)
+    revoked_at = Column(DateTime, nullable=True, index=True)
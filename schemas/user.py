@@ -1,7 +1,12 @@
-from pydantic import BaseModel, validator, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints
+from typing import Annotated, List, Optional
 from datetime import datetime
 
+# Normalization as core constraints: stripping, lowercasing and length checks
+# run inside pydantic-core instead of calling back into Python validators
+NormalizedEmail = Annotated[str, StringConstraints(strip_whitespace=True, to_lower=True)]
+TrimmedName = Annotated[str, StringConstraints(strip_whitespace=True, min_length=2, max_length=50)]
+
 class UserBase(BaseModel):
     """Base user schema with common fields"""
     email: str = Field(..., description="User email address")
@@ -9,51 +14,81 @@ class UserBase(BaseModel):
 
 class UserCreate(UserBase):
     """Schema for user registration"""
+    email: NormalizedEmail = Field(..., min_length=1, description="User email address, stored lowercase")
+    name: TrimmedName = Field(..., description="User full name")
     password: str = Field(..., min_length=6, max_length=100, description="User password")
-    
-    @validator('email')
-    def validate_email(cls, v):
-        """Normalize email to lowercase"""
-        if not v or not v.strip():
-            raise ValueError('Email is required')
-        return v.lower().strip()
-    
-    @validator('name')
-    def validate_name(cls, v):
-        """Validate name"""
-        if not v or not v.strip():
-            raise ValueError('Name is required')
-        return v.strip()
-    
-    @validator('password')
-    def validate_password(cls, v):
-        """Validate password"""
-        if not v or len(v) < 6:
-            raise ValueError('Password must be at least 6 characters long')
-        return v
+
+class UserUpdate(UserBase):
+    """Schema for updating a user; the password (and with it every session) only changes when given"""
+    email: NormalizedEmail = Field(..., min_length=1, description="User email address, stored lowercase")
+    name: TrimmedName = Field(..., description="User full name")
+    password: Optional[str] = Field(None, min_length=6, max_length=100, description="New password; signs the user out everywhere")
 
 class UserLogin(BaseModel):
     """Schema for user login"""
-    email: str = Field(..., description="User email address")
+    email: NormalizedEmail = Field(..., description="User email address")
     password: str = Field(..., description="User password")
-    
-    @validator('email')
-    def validate_email(cls, v):
-        """Normalize email to lowercase"""
-        return v.lower().strip() if v else None
 
 class UserResponse(BaseModel):
     """Schema for user responses (excludes sensitive data)"""
     id: int
     email: str
     name: str
-    
-    class Config:
-        from_attributes = True
+
+    model_config = ConfigDict(from_attributes=True)
+
+class UserPage(BaseModel):
+    """Schema for a keyset-paginated page of users"""
+    items: List[UserResponse]
+    next_cursor: Optional[int] = Field(None, description="Pass as `after` to fetch the next page")
+
+class UserSearchPage(BaseModel):
+    """Schema for a page of ranked search results"""
+    items: List[UserResponse]
+    next_offset: Optional[int] = Field(None, description="Pass as `offset` to fetch the next page")
+
+class UserBatchRequest(BaseModel):
+    """Schema for fetching many users by id"""
+    ids: List[int] = Field(..., min_length=1, max_length=5000, description="User ids, at most 5000")
+
+class UserBatch(BaseModel):
+    """Schema for users fetched by id, in request order"""
+    items: List[UserResponse]
+    missing: List[int] = Field(default_factory=list, description="Requested ids that do not exist")
+
+class BulkImportRow(BaseModel):
+    """Outcome of one row of a bulk import"""
+    line: int
+    email: Optional[str] = None
+    status: str = Field(..., description="created, duplicate or invalid")
+    detail: Optional[str] = None
+
+class BulkImportResult(BaseModel):
+    """Schema for a bulk import report"""
+    total: int
+    created: int
+    failed: int
+    elapsed_seconds: float
+    rows_per_second: float
+    results: List[BulkImportRow]
+
+class UserSnapshot(BaseModel):
+    """Cached identity of an authenticated user"""
+    id: int
+    email: str
+    name: str
+    is_active: bool = True
+
+    model_config = ConfigDict(from_attributes=True)
+
+class RefreshRequest(BaseModel):
+    """Schema for exchanging a refresh token"""
+    refresh_token: str = Field(..., min_length=1, description="Refresh token from login or the last refresh")
 
 class Token(BaseModel):
     """Schema for authentication tokens"""
     access_token: str
     token_type: str = "bearer"
     expires_in: int
+    refresh_token: Optional[str] = Field(None, description="Single use: exchange at /users/refresh for new tokens")
     user: UserResponse
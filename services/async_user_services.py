@@ -0,0 +1,203 @@
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from config.database import async_session
+from models.models import User
+from schemas.user import UserCreate, UserLogin, UserSnapshot, UserUpdate
+from fastapi import HTTPException, status
+from services.user_services import (
+    UserService, USER_BATCH_CHUNK_SIZE, USER_BATCH_CACHE, USER_ROW, search_clauses, supports_returning,
+    user_update_statement,
+)
+from utils.secure import hash_password, verify_password
+from utils.hash_pool import hash_pool
+from utils.cache import user_cache
+from utils.search_index import search_index
+from utils.broadcast import worker_broadcast
+from services.event_bus import event_bus, record_event_async
+from services.session_services import session_service
+from typing import List, Optional
+import json
+
+class AsyncUserService:
+    """UserService counterpart running on an AsyncSession (DB_ASYNC=true)"""
+
+    def __init__(self):
+        self.user_service = UserService()
+
+    async def _get_user(self, db: AsyncSession, *criteria):
+        result = await db.execute(select(User).where(*criteria))
+        return result.scalar_one_or_none()
+
+    async def create_user(self, user_data: UserCreate, db: AsyncSession):
+        """Create new user (INSERT first; the unique email index reports duplicates)"""
+        hashed_password = await hash_pool.run(hash_password, user_data.password)
+        db_user = User(
+            email=user_data.email,
+            name=user_data.name,
+            password=hashed_password
+        )
+        db.add(db_user)
+        try:
+            event = await record_event_async(db, "user.created", db_user)
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail="Email already registered")
+        user = UserSnapshot.model_validate(db_user)
+        await db.commit()
+        worker_broadcast.emit("search.add", user_id=user.id, name=user.name, email=user.email)
+        event_bus.publish(event)
+
+        return await self.generate_token_response(user, db)
+
+    async def authenticate_user(self, credentials: UserLogin, db: AsyncSession):
+        """Authenticate user and return token"""
+        user = await self._get_user(db, User.email == credentials.email)
+
+        if not user or not await hash_pool.run(verify_password, credentials.password, user.password):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid credentials"
+            )
+
+        self.user_service.schedule_rehash(user, credentials.password)
+        return await self.generate_token_response(user, db)
+
+    async def generate_token_response(self, user, db: AsyncSession):
+        """Start a login session (see UserService.generate_token_response)"""
+        user = UserSnapshot.model_validate(user)
+        session_id, refresh_token = await session_service.start_session_async(db, user.id)
+        return self.user_service.token_response(user, session_id, refresh_token)
+
+    async def refresh_session(self, refresh_token: str, db: AsyncSession):
+        """Exchange a refresh token for new access and refresh tokens"""
+        session_id, new_refresh_token, user = await session_service.rotate_async(db, refresh_token)
+        return self.user_service.token_response(user, session_id, new_refresh_token)
+
+    async def get_users_page(self, db: AsyncSession, limit: int = 100, after: Optional[int] = None):
+        """Get one page of users ordered by id, starting after the given id"""
+        query = select(User).order_by(User.id)
+        if after is not None:
+            query = query.where(User.id > after)
+        result = await db.execute(query.limit(limit + 1))
+        users = result.scalars().all()
+        next_cursor = users[limit - 1].id if len(users) > limit else None
+        return {"items": users[:limit], "next_cursor": next_cursor}
+
+    async def export_users_ndjson(self, batch_size: int = 1000):
+        """Yield every user as NDJSON, one chunk per batch (see UserService.export_users_ndjson)"""
+        async with async_session() as db:
+            query = (
+                select(User.id, User.email, User.name)
+                .order_by(User.id)
+                .execution_options(yield_per=batch_size)
+            )
+            result = await db.stream(query)
+            async for rows in result.partitions():
+                yield "".join(
+                    json.dumps({"id": row.id, "email": row.email, "name": row.name}) + "\n"
+                    for row in rows
+                )
+
+    async def search_users(self, db: AsyncSession, q: str, limit: int = 20, offset: int = 0):
+        """Ranked matches on name and email (see UserService.search_users)"""
+        if search_index.ready and len(q) >= search_index.min_query_length:
+            items, more = search_index.search(q, limit, offset)
+        else:
+            where, order = search_clauses(q)
+            result = await db.execute(select(User).where(where).order_by(*order).offset(offset).limit(limit + 1))
+            users = result.scalars().all()
+            items, more = users[:limit], len(users) > limit
+        return {"items": items, "next_offset": offset + limit if more else None}
+
+    async def get_users_page_versions(self, db: AsyncSession, limit: int = 100, after: Optional[int] = None):
+        """Get only (id, version) of a page's rows, the watermark behind its ETag"""
+        query = select(User.id, User.version).order_by(User.id)
+        if after is not None:
+            query = query.where(User.id > after)
+        rows = (await db.execute(query.limit(limit + 1))).all()
+        next_cursor = rows[limit - 1].id if len(rows) > limit else None
+        return {"items": rows[:limit], "next_cursor": next_cursor}
+
+    async def get_user_version(self, user_id: int, db: AsyncSession):
+        """Get only a user's version, for answering conditional GETs"""
+        version = (await db.execute(select(User.version).where(User.id == user_id))).scalar()
+        if version is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        return version
+
+    async def get_user_by_id(self, user_id: int, db: AsyncSession):
+        user = await db.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        return user
+
+    async def get_users_by_ids(self, user_ids: List[int], db: AsyncSession):
+        """Get many users by id in request order (see UserService.get_users_by_ids)"""
+        ids = list(dict.fromkeys(user_ids))
+        found = {}
+        for user_id in ids:
+            user = db.identity_map.get(db.identity_key(User, user_id))
+            if user is not None:
+                found[user_id] = user
+        pending = [user_id for user_id in ids if user_id not in found]
+        if USER_BATCH_CACHE and pending:
+            found.update(user_cache.get_many_by_id(pending))
+            pending = [user_id for user_id in pending if user_id not in found]
+
+        for start in range(0, len(pending), USER_BATCH_CHUNK_SIZE):
+            chunk = pending[start:start + USER_BATCH_CHUNK_SIZE]
+            for user in (await db.execute(select(User).where(User.id.in_(chunk)))).scalars():
+                found[user.id] = user
+                if USER_BATCH_CACHE:
+                    user_cache.set(user)
+
+        return {
+            "items": [found[user_id] for user_id in ids if user_id in found],
+            "missing": [user_id for user_id in ids if user_id not in found],
+        }
+
+    async def update_user(self, user_id: int, user_data: UserUpdate, db: AsyncSession):
+        """UPDATE a user in place (see UserService.update_user)"""
+        password = await hash_pool.run(hash_password, user_data.password) if user_data.password else None
+        statement = user_update_statement(user_id, user_data, password)
+        try:
+            if supports_returning(db, "update"):
+                user = (await db.execute(statement.returning(*USER_ROW))).first()
+            elif (await db.execute(statement)).rowcount:
+                user = (await db.execute(select(*USER_ROW).where(User.id == user_id))).first()
+            else:
+                user = None
+            if user is None:
+                raise HTTPException(status_code=404, detail="User not found")
+            session_ids = await session_service.revoke_user_sessions_async(db, user_id) if password else []
+            event = await record_event_async(db, "user.updated", user)
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail="Email already registered")
+        session_service.revoked(session_ids)
+        self.user_service.forget_user(user.id, user.email)
+        worker_broadcast.emit("search.add", user_id=user.id, name=user.name, email=user.email)
+        event_bus.publish(event)
+        return user
+
+    async def delete_user(self, user_id: int, db: AsyncSession):
+        """DELETE a user (see UserService.delete_user)"""
+        statement = delete(User).where(User.id == user_id).execution_options(synchronize_session=False)
+        if supports_returning(db, "delete"):
+            user = (await db.execute(statement.returning(*USER_ROW))).first()
+        else:
+            user = (await db.execute(select(*USER_ROW).where(User.id == user_id))).first()
+            if user is not None:
+                await db.execute(statement)
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        session_ids = await session_service.revoke_user_sessions_async(db, user.id)
+        event = await record_event_async(db, "user.deleted", user)
+        await db.commit()
+        session_service.revoked(session_ids)
+        self.user_service.forget_user(user.id, user.email)
+        worker_broadcast.emit("search.remove", user_id=user.id)
+        event_bus.publish(event)
+        return {"message": "User deleted successfully"}
@@ -0,0 +1,294 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from config.database import session
+from models.models import UserEvent
+from utils.metrics import registry
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# Event bus configuration
+EVENT_BUS_BATCH_SIZE = int(os.getenv("EVENT_BUS_BATCH_SIZE", "100"))
+EVENT_BUS_FLUSH_INTERVAL = float(os.getenv("EVENT_BUS_FLUSH_INTERVAL", "1.0"))   # seconds
+EVENT_BUS_MAX_QUEUE = int(os.getenv("EVENT_BUS_MAX_QUEUE", "10000"))
+EVENT_OUTBOX_SWEEP_INTERVAL = float(os.getenv("EVENT_OUTBOX_SWEEP_INTERVAL", "30"))
+EVENT_RETENTION_HOURS = float(os.getenv("EVENT_RETENTION_HOURS", "168"))  # dispatched rows kept; 0 keeps them forever
+EVENT_SINK_PATH = os.getenv("EVENT_SINK_PATH", "")  # NDJSON file; empty keeps events in the outbox only
+
+logger = logging.getLogger(__name__)
+
+events_published_total = registry.counter("events_published_total", "User events handed to the event bus")
+events_deferred_total = registry.counter(
+    "events_deferred_total", "Events left to the outbox sweep because the bus queue was full"
+)
+events_dispatched_total = registry.counter("events_dispatched_total", "Events accepted by the sink")
+events_pruned_total = registry.counter("events_pruned_total", "Dispatched outbox rows deleted after the retention period")
+
+def _event(event_type: str, user) -> Dict[str, Any]:
+    return {
+        "type": event_type,
+        "user_id": user.id,
+        "occurred_at": datetime.utcnow().isoformat(timespec="milliseconds") + "Z",
+        "data": {"email": user.email, "name": user.name, "version": user.version},
+    }
+
+def record_event(db: Session, event_type: str, user) -> Dict[str, Any]:
+    """
+    Add an outbox row for a user change to the current transaction
+
+    Call before commit, then hand the returned event to event_bus.publish()
+    once the commit succeeded: the row makes delivery at-least-once even if
+    the process dies before the bus flushes.
+    """
+    if user.id is None:
+        db.flush()
+    event = _event(event_type, user)
+    row = UserEvent(event_type=event_type, user_id=user.id, payload=json.dumps(event), created_at=datetime.utcnow())
+    db.add(row)
+    db.flush()
+    event["id"] = row.id
+    return event
+
+def record_events(db: Session, event_type: str, users) -> List[Dict[str, Any]]:
+    """record_event for many already-inserted users (rows with id, email, name and version)"""
+    events = [_event(event_type, user) for user in users]
+    now = datetime.utcnow()
+    rows = [
+        UserEvent(event_type=event_type, user_id=event["user_id"], payload=json.dumps(event), created_at=now)
+        for event in events
+    ]
+    db.add_all(rows)
+    db.flush()
+    for event, row in zip(events, rows):
+        event["id"] = row.id
+    return events
+
+async def record_event_async(db: "AsyncSession", event_type: str, user) -> Dict[str, Any]:
+    """record_event on an AsyncSession"""
+    if user.id is None:
+        await db.flush()
+    event = _event(event_type, user)
+    row = UserEvent(event_type=event_type, user_id=user.id, payload=json.dumps(event), created_at=datetime.utcnow())
+    db.add(row)
+    await db.flush()
+    event["id"] = row.id
+    return event
+
+class EventSink:
+    """Destination for batches of events; write() raising leaves them in the outbox"""
+
+    async def write(self, events: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+class FileEventSink(EventSink):
+    """Appends events to a local NDJSON file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _append(self, lines: str):
+        with open(self.path, "a", encoding="utf-8") as sink:
+            sink.write(lines)
+            sink.flush()
+            os.fsync(sink.fileno())
+
+    async def write(self, events):
+        await asyncio.to_thread(self._append, "".join(json.dumps(event) + "\n" for event in events))
+
+class EventBus:
+    """
+    Write-behind dispatcher for outbox events
+
+    Requests publish events after their commit without waiting; a
+    background task batches them (EVENT_BUS_BATCH_SIZE or every
+    EVENT_BUS_FLUSH_INTERVAL seconds), hands each batch to the sink and
+    marks the outbox rows dispatched. The queue is bounded: when it is
+    full an event is left to the periodic outbox sweep, which also
+    redelivers anything a crash or a failing sink left behind, and deletes
+    dispatched rows older than EVENT_RETENTION_HOURS.
+    """
+
+    def __init__(self, sink: Optional[EventSink] = None, batch_size: int = EVENT_BUS_BATCH_SIZE,
+                 flush_interval: float = EVENT_BUS_FLUSH_INTERVAL, max_queue: int = EVENT_BUS_MAX_QUEUE,
+                 sweep_interval: float = EVENT_OUTBOX_SWEEP_INTERVAL, retention_hours: float = EVENT_RETENTION_HOURS):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.sweep_interval = sweep_interval
+        self.retention_hours = retention_hours
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def running(self) -> bool:
+        return self._queue is not None
+
+    @property
+    def depth(self) -> int:
+        """Events waiting in the queue"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        """Start the flush and sweep tasks on the running loop"""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._flush_lock = asyncio.Lock()
+        self._tasks = [asyncio.create_task(self._run()), asyncio.create_task(self._sweep_loop())]
+
+    def publish(self, event: Dict[str, Any]):
+        """Queue a committed event; safe to call from threadpool threads, never blocks"""
+        if self._queue is None:
+            return
+        events_published_total.inc()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._offer(event)
+        else:
+            self._loop.call_soon_threadsafe(self._offer, event)
+
+    def _offer(self, event):
+        if self._queue is None:
+            events_deferred_total.inc()
+            return
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            events_deferred_total.inc()
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> bool:
+        async with self._flush_lock:
+            try:
+                if self.sink is not None:
+                    await self.sink.write(batch)
+                await run_in_threadpool(self._mark_dispatched, [event["id"] for event in batch])
+            except Exception as e:
+                # The rows stay undispatched; the sweep retries them
+                logger.warning("Event batch of %d failed, left in outbox: %s", len(batch), e)
+                return False
+            events_dispatched_total.inc(len(batch))
+            return True
+
+    def _mark_dispatched(self, ids: List[int]):
+        db = session()
+        try:
+            db.query(UserEvent).filter(UserEvent.id.in_(ids)).update(
+                {UserEvent.dispatched_at: datetime.utcnow()}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _pending(self, older_than: float, limit: int) -> List[Dict[str, Any]]:
+        db = session()
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=older_than)
+            rows = (
+                db.query(UserEvent.id, UserEvent.payload)
+                .filter(UserEvent.dispatched_at.is_(None), UserEvent.created_at <= cutoff)
+                .order_by(UserEvent.id)
+                .limit(limit)
+                .all()
+            )
+            return [{**json.loads(row.payload), "id": row.id} for row in rows]
+        finally:
+            db.close()
+
+    async def sweep(self, older_than: float = 0):
+        """Deliver undispatched outbox rows (crash recovery, full queue, failed sink)"""
+        while True:
+            pending = await run_in_threadpool(self._pending, older_than, self.batch_size)
+            if not pending:
+                return
+            if not await self._flush(pending) or len(pending) < self.batch_size:
+                return
+
+    def _prune(self, limit: int) -> int:
+        db = session()
+        try:
+            cutoff = datetime.utcnow() - timedelta(hours=self.retention_hours)
+            ids = [
+                row.id for row in db.query(UserEvent.id)
+                .filter(UserEvent.dispatched_at.is_not(None), UserEvent.dispatched_at < cutoff)
+                .order_by(UserEvent.id)
+                .limit(limit)
+            ]
+            if ids:
+                db.query(UserEvent).filter(UserEvent.id.in_(ids)).delete(synchronize_session=False)
+                db.commit()
+            return len(ids)
+        finally:
+            db.close()
+
+    async def prune(self) -> int:
+        """Delete dispatched outbox rows older than the retention period, in batches"""
+        if self.retention_hours <= 0:
+            return 0
+        pruned = 0
+        while True:
+            deleted = await run_in_threadpool(self._prune, self.batch_size * 10)
+            pruned += deleted
+            events_pruned_total.inc(deleted)
+            if deleted < self.batch_size * 10:
+                return pruned
+
+    async def _sweep_loop(self):
+        while True:
+            try:
+                # Skip rows young enough to still be on their way through the queue
+                await self.sweep(older_than=self.sweep_interval)
+                await self.prune()
+            except Exception as e:
+                logger.warning("Outbox sweep failed: %s", e)
+            await asyncio.sleep(self.sweep_interval)
+
+    async def drain(self):
+        """Stop accepting events, flush what is queued and sweep the outbox once more"""
+        queue, self._queue = self._queue, None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if queue is None:
+            return
+        batch = []
+        while not queue.empty():
+            batch.append(queue.get_nowait())
+            if len(batch) >= self.batch_size:
+                await self._flush(batch)
+                batch = []
+        if batch:
+            await self._flush(batch)
+        try:
+            await self.sweep()
+        except Exception as e:
+            logger.warning("Final outbox sweep failed: %s", e)
+
+# Create bus instance
+event_bus = EventBus(FileEventSink(EVENT_SINK_PATH) if EVENT_SINK_PATH else None)
+registry.gauge("event_bus_queue_depth", "Events waiting in the event bus queue", function=lambda: event_bus.depth)
@@ -0,0 +1,295 @@
+import asyncio
+import hashlib
+import logging
+import os
+import secrets
+import time
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from config.database import session
+from models.models import RefreshToken, User
+from utils.broadcast import worker_broadcast
+from utils.revocation import RevocationList, revoked_sessions
+from utils.secure import ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# Seconds between reads of revocations made by other processes or hosts
+REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", "5"))
+# Each sync re-reads this far behind the last one, for revocations committed late
+REVOCATION_SYNC_OVERLAP = 60
+# Seconds between deletions of expired refresh tokens, and rows deleted per statement
+REFRESH_TOKEN_PRUNE_INTERVAL = float(os.getenv("REFRESH_TOKEN_PRUNE_INTERVAL", "300"))
+REFRESH_TOKEN_PRUNE_BATCH = int(os.getenv("REFRESH_TOKEN_PRUNE_BATCH", "1000"))
+
+logger = logging.getLogger(__name__)
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+class SessionService:
+    """
+    Login sessions: refresh tokens and their revocation
+
+    A login starts a session (sid) with one refresh token. /users/refresh
+    exchanges that token for a new access token and a new refresh token in
+    the same session; presenting an exchanged token again revokes the
+    session, as do deleting the user and changing their password.
+
+    Revocations are stamped on the refresh_tokens rows. They reach
+    revoked_sessions at once in this process and its sibling workers, and
+    sync() picks up the rest (other hosts, dropped broadcasts) by reading
+    rows revoked since the previous sync. Every login and refresh adds a
+    row, so the sync loop also deletes expired rows once no sync can still
+    need their revocation (prune()).
+    """
+
+    def __init__(self, revocations: RevocationList = revoked_sessions,
+                 sync_interval: float = REVOCATION_SYNC_INTERVAL):
+        self.revocations = revocations
+        self.sync_interval = sync_interval
+        self.access_ttl = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        self._watermark: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pruned_at = 0.0
+
+    def _new_token(self, user_id: int, session_id: str, now: datetime) -> Tuple[RefreshToken, str]:
+        token = secrets.token_urlsafe(32)
+        row = RefreshToken(
+            token_hash=hash_refresh_token(token),
+            session_id=session_id,
+            user_id=user_id,
+            created_at=now,
+            expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+        return row, token
+
+    def _invalid(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    def _lookup(self, token_hash: str):
+        return select(
+            RefreshToken.id, RefreshToken.session_id, RefreshToken.user_id, RefreshToken.used_at,
+        ).where(RefreshToken.token_hash == token_hash)
+
+    def _claim(self, token_hash: str, now: datetime):
+        # Only one of two concurrent exchanges of the same token matches, and
+        # only while the token is live: the primary decides, never a replica
+        return (
+            update(RefreshToken)
+            .where(
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.used_at.is_(None),
+                RefreshToken.revoked_at.is_(None),
+                RefreshToken.expires_at > now,
+            )
+            .values(used_at=now)
+            .execution_options(synchronize_session=False)
+        )
+
+    def _revoke(self, criterion, now: datetime):
+        return (
+            update(RefreshToken)
+            .where(criterion, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=now)
+            .execution_options(synchronize_session=False)
+        )
+
+    def _live_sessions(self, user_id: int, now: datetime):
+        return (
+            select(RefreshToken.session_id)
+            .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None), RefreshToken.expires_at > now)
+            .distinct()
+        )
+
+    def start_session(self, db: Session, user_id: int) -> Tuple[str, str]:
+        """Store the first refresh token of a new session; returns (session_id, refresh_token)"""
+        session_id = secrets.token_hex(16)
+        row, token = self._new_token(user_id, session_id, datetime.utcnow())
+        db.add(row)
+        db.commit()
+        return session_id, token
+
+    async def start_session_async(self, db: "AsyncSession", user_id: int) -> Tuple[str, str]:
+        """start_session on an AsyncSession"""
+        session_id = secrets.token_hex(16)
+        row, token = self._new_token(user_id, session_id, datetime.utcnow())
+        db.add(row)
+        await db.commit()
+        return session_id, token
+
+    def rotate(self, db: Session, refresh_token: str):
+        """
+        Exchange a refresh token for the next one of its session
+
+        Returns (session_id, new refresh token, user row). Raises 401 for an
+        unknown, expired or revoked token, and revokes the session when the
+        token was already exchanged: someone else holds a copy of it.
+
+        The claim UPDATE runs first, so the session is pinned to the primary
+        and the lookup never reads a lagging replica.
+        """
+        now = datetime.utcnow()
+        token_hash = hash_refresh_token(refresh_token)
+        claimed = db.execute(self._claim(token_hash, now)).rowcount
+        row = db.execute(self._lookup(token_hash)).first()
+        if row is None or not claimed:
+            if row is not None and row.used_at is not None:
+                revoked = db.execute(self._revoke(RefreshToken.session_id == row.session_id, now)).rowcount
+                db.commit()
+                if revoked:
+                    self.revoked([row.session_id])
+            else:
+                db.rollback()
+            raise self._invalid()
+        user = db.execute(select(User.id, User.email, User.name).where(User.id == row.user_id)).first()
+        if user is None:
+            db.rollback()
+            raise self._invalid()
+        new_row, token = self._new_token(row.user_id, row.session_id, now)
+        db.add(new_row)
+        db.commit()
+        return row.session_id, token, user
+
+    async def rotate_async(self, db: "AsyncSession", refresh_token: str):
+        """rotate on an AsyncSession"""
+        now = datetime.utcnow()
+        token_hash = hash_refresh_token(refresh_token)
+        claimed = (await db.execute(self._claim(token_hash, now))).rowcount
+        row = (await db.execute(self._lookup(token_hash))).first()
+        if row is None or not claimed:
+            if row is not None and row.used_at is not None:
+                revoked = (await db.execute(self._revoke(RefreshToken.session_id == row.session_id, now))).rowcount
+                await db.commit()
+                if revoked:
+                    self.revoked([row.session_id])
+            else:
+                await db.rollback()
+            raise self._invalid()
+        user = (await db.execute(select(User.id, User.email, User.name).where(User.id == row.user_id))).first()
+        if user is None:
+            await db.rollback()
+            raise self._invalid()
+        new_row, token = self._new_token(row.user_id, row.session_id, now)
+        db.add(new_row)
+        await db.commit()
+        return row.session_id, token, user
+
+    def revoke_user_sessions(self, db: Session, user_id: int) -> List[str]:
+        """
+        Revoke every session of a user in the caller's transaction
+
+        Returns the session ids; pass them to revoked() once committed.
+        """
+        now = datetime.utcnow()
+        session_ids = db.execute(self._live_sessions(user_id, now)).scalars().all()
+        if session_ids:
+            db.execute(self._revoke(RefreshToken.user_id == user_id, now))
+        return session_ids
+
+    async def revoke_user_sessions_async(self, db: "AsyncSession", user_id: int) -> List[str]:
+        """revoke_user_sessions on an AsyncSession"""
+        now = datetime.utcnow()
+        session_ids = (await db.execute(self._live_sessions(user_id, now))).scalars().all()
+        if session_ids:
+            await db.execute(self._revoke(RefreshToken.user_id == user_id, now))
+        return session_ids
+
+    def revoked(self, session_ids: List[str]):
+        """Reject access tokens of committed revocations here and in sibling workers"""
+        if session_ids:
+            # Tokens issued up to now expire within one access token lifetime
+            worker_broadcast.emit("session.revoke", session_ids=list(session_ids), until=time.time() + self.access_ttl)
+
+    def sync(self) -> int:
+        """Load revocations committed since the last sync; returns how many sessions were read"""
+        now = datetime.utcnow()
+        if self._watermark is None:
+            # Older revocations only concern tokens that have expired already
+            since = now - timedelta(seconds=self.access_ttl)
+        else:
+            since = self._watermark - timedelta(seconds=REVOCATION_SYNC_OVERLAP)
+        db = session()
+        try:
+            rows = db.execute(
+                select(RefreshToken.session_id, func.max(RefreshToken.revoked_at))
+                .where(RefreshToken.revoked_at > since)
+                .group_by(RefreshToken.session_id)
+            ).all()
+        finally:
+            db.close()
+        self._watermark = now
+        for session_id, revoked_at in rows:
+            until = revoked_at.replace(tzinfo=timezone.utc).timestamp() + self.access_ttl
+            self.revocations.revoke([session_id], until)
+        self.revocations.prune()
+        return len(rows)
+
+    def prune(self, batch_size: int = REFRESH_TOKEN_PRUNE_BATCH) -> int:
+        """
+        Delete expired refresh tokens, in batches; returns how many rows went
+
+        An expired token cannot be exchanged any more, so its row only matters
+        while its revocation may still be read by sync() on another host:
+        rows revoked within the last access token lifetime (plus the sync
+        overlap) are kept until that has passed.
+        """
+        now = datetime.utcnow()
+        revocation_window = now - timedelta(seconds=self.access_ttl + REVOCATION_SYNC_OVERLAP)
+        deleted = 0
+        db = session()
+        try:
+            while True:
+                ids = db.execute(
+                    select(RefreshToken.id)
+                    .where(
+                        RefreshToken.expires_at < now,
+                        or_(RefreshToken.revoked_at.is_(None), RefreshToken.revoked_at < revocation_window),
+                    )
+                    .limit(batch_size)
+                ).scalars().all()
+                if ids:
+                    db.execute(delete(RefreshToken).where(RefreshToken.id.in_(ids)))
+                    db.commit()
+                deleted += len(ids)
+                if len(ids) < batch_size:
+                    return deleted
+        finally:
+            db.close()
+
+    async def start(self):
+        """Load current revocations, then keep syncing in the background"""
+        await run_in_threadpool(self.sync)
+        self._task = asyncio.create_task(self._sync_loop())
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await run_in_threadpool(self.sync)
+            except Exception as e:
+                logger.warning("Revocation sync failed: %s", e)
+            if time.monotonic() - self._pruned_at >= REFRESH_TOKEN_PRUNE_INTERVAL:
+                self._pruned_at = time.monotonic()
+                try:
+                    await run_in_threadpool(self.prune)
+                except Exception as e:
+                    logger.warning("Refresh token pruning failed: %s", e)
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+# Create service instance
+session_service = SessionService()
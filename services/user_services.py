@@ -1,90 +1,393 @@
+from sqlalchemy import and_, case, delete, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from config.database import release_connection, session
 from models.models import User
-from schemas.user import UserCreate, UserLogin
+from schemas.user import UserCreate, UserLogin, UserSnapshot, UserUpdate
 from fastapi import HTTPException, status
-from utils.secure import hash_password, verify_password, create_access_token
-from datetime import timedelta
+from starlette.concurrency import run_in_threadpool
+from utils.secure import ACCESS_TOKEN_EXPIRE_MINUTES, hash_password, verify_password, password_needs_rehash, create_access_token
+from utils.hash_pool import hash_pool
+from utils.cache import token_cache, user_cache
+from utils.metrics import timed_stage
+from utils.search_index import search_index
+from utils.broadcast import worker_broadcast
+from services.event_bus import event_bus, record_event
+from services.session_services import session_service
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
 import os
-from dotenv import load_dotenv
-load_dotenv(dotenv_path="./env_files/.env")
+import threading
 
-class UserService:
-    def __init__(self):
-        self.secret_key = os.getenv("SECRET_KEY")
+logger = logging.getLogger(__name__)
 
-    def create_user(self, user_data: UserCreate, db: Session):
-        """Create new user"""
-        existing_user = db.query(User).filter(User.email == user_data.email).first()
-        if existing_user:
-            raise HTTPException(status_code=400, detail="Email already registered")
-        
-        # Use security utils
-        hashed_password = hash_password(user_data.password)
+# Batch lookups: ids per IN query, and whether to read through the shared user cache
+USER_BATCH_CHUNK_SIZE = int(os.getenv("USER_BATCH_CHUNK_SIZE", "500"))
+USER_BATCH_CACHE = os.getenv("USER_BATCH_CACHE", "false").lower() in ("1", "true", "yes")
+
+# Columns a write returns: enough for the response, the ETag and the outbox event
+USER_ROW = (User.id, User.email, User.name, User.version)
+
+def supports_returning(db, kind: str) -> bool:
+    """Whether the session's dialect supports UPDATE/DELETE ... RETURNING (kind is update or delete)"""
+    return getattr(db.get_bind().dialect, f"{kind}_returning", False)
+
+def user_update_statement(user_id: int, user_data: UserUpdate, password: Optional[str]):
+    """UPDATE users SET name, email[, password], version = version + 1 WHERE id"""
+    values = {User.name: user_data.name, User.email: user_data.email, User.version: User.version + 1}
+    if password:
+        values[User.password] = password
+    return (
+        update(User)
+        .where(User.id == user_id)
+        .values(values)
+        .execution_options(synchronize_session=False)
+    )
+
+# Stores rehashed passwords: one thread, so the UPDATEs never run on a hash
+# worker or on ProcessPoolExecutor's result thread, and hold one connection at most
+_rehash_store_executor = None
+_rehash_store_lock = threading.Lock()
+
+def get_rehash_store_executor() -> ThreadPoolExecutor:
+    global _rehash_store_executor
+    if _rehash_store_executor is None:
+        with _rehash_store_lock:
+            if _rehash_store_executor is None:
+                _rehash_store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rehash-store")
+    return _rehash_store_executor
+
+def shutdown_rehash_store_executor():
+    global _rehash_store_executor
+    with _rehash_store_lock:
+        executor, _rehash_store_executor = _rehash_store_executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+def forget_user_locally(user_id: int, email: str):
+    # Tokens and snapshots of the old identity must be looked up again
+    token_cache.invalidate_subject(user_id)
+    user_cache.invalidate_id(user_id, email)
+
+worker_broadcast.subscribe("user.forget", forget_user_locally)
+
+def prefix_range(column, prefix: str):
+    """column starts with prefix, as a range a B-tree index serves (unlike LIKE on most setups)"""
+    return and_(column >= prefix, column < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+def search_clauses(q: str):
+    """
+    WHERE clause and ORDER BY columns for a ranked user search in SQL
+
+    Only prefixes match: emails are stored lowercase and names are indexed
+    by lower(name), so each side is one index range scan. A substring
+    match ('%q%') would scan the whole table; substring and word matches
+    need the trigram index (USER_SEARCH_BACKEND=trigram). Exact matches
+    rank before other prefixes.
+    """
+    q = q.lower()
+    name = func.lower(User.name)
+    where = or_(prefix_range(User.email, q), prefix_range(name, q))
+    rank = case((or_(User.email == q, name == q), 0), else_=1)
+    return where, (rank, func.length(User.name), User.id)
+
+class UserService:
+    async def create_user_async(self, user_data: UserCreate, db: Session):
+        """Create new user, hashing the password on the hash worker pool"""
+        hashed_password = await hash_pool.run(hash_password, user_data.password)
         db_user = User(
             email=user_data.email,
             name=user_data.name,
             password=hashed_password
         )
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
-        
-        return self.generate_token_response(db_user)
-
-    def authenticate_user(self, credentials: UserLogin, db: Session):
-        """Authenticate user and return token"""
-        user = db.query(User).filter(User.email == credentials.email).first()
-        
-        if not user or not verify_password(credentials.password, user.password):
+        user = await run_in_threadpool(self._save_user, db_user, db)
+
+        return await run_in_threadpool(self.generate_token_response, user, db)
+
+    async def authenticate_user_async(self, credentials: UserLogin, db: Session):
+        """Authenticate user, verifying the password on the hash worker pool"""
+        user = await run_in_threadpool(self._get_login_user, credentials.email, db)
+
+        if not user or not await hash_pool.run(verify_password, credentials.password, user.password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials"
             )
-        
-        return self.generate_token_response(user)
 
-    def get_all_users(self, db: Session):
-        return db.query(User).all()
+        self.schedule_rehash(user, credentials.password)
+        return await run_in_threadpool(self.generate_token_response, user, db)
+
+    def schedule_rehash(self, user: User, password: str):
+        """
+        Rehash an outdated password hash in the background after a successful login
+
+        Hashes made with a deprecated scheme or a lower cost than the current
+        settings are replaced on the hash pool, off the request path. This is
+        best effort: if the pool is full the next login tries again. The
+        done callback only hands the result over; the UPDATE runs on the
+        rehash store executor, so no other hash result waits for the database.
+        """
+        if not password_needs_rehash(user.password):
+            return
+        user_id, old_hash = user.id, user.password
+        future = hash_pool.submit(hash_password, password)
+        if future is not None:
+            future.add_done_callback(
+                lambda done: get_rehash_store_executor().submit(self._store_rehash, user_id, old_hash, done)
+            )
+
+    def _store_rehash(self, user_id: int, old_hash: str, future):
+        if future.cancelled() or future.exception() is not None:
+            logger.warning("Password rehash for user %s failed: %s", user_id, future.exception())
+            return
+        db = session()
+        try:
+            # Only replace the hash that was verified, never a password changed meanwhile
+            db.query(User).filter(User.id == user_id, User.password == old_hash).update(
+                {User.password: future.result()}, synchronize_session=False
+            )
+            db.commit()
+        except Exception as e:
+            logger.warning("Storing rehashed password for user %s failed: %s", user_id, e)
+            db.rollback()
+        finally:
+            db.close()
+
+    def _get_user_by_email(self, email: str, db: Session):
+        return db.query(User).filter(User.email == email).first()
+
+    def _get_login_user(self, email: str, db: Session):
+        """Look a user up for login; the connection goes back to the pool while bcrypt runs"""
+        user = self._get_user_by_email(email, db)
+        release_connection(db)
+        return user
 
+    def _save_user(self, db_user: User, db: Session) -> UserSnapshot:
+        """
+        INSERT a new user and its outbox event, then commit
+
+        Relies on the unique index on email rather than looking the email
+        up first: a duplicate fails the INSERT and becomes the usual 400.
+        The snapshot is taken before commit so nothing has to be reloaded.
+        """
+        db.add(db_user)
+        try:
+            event = record_event(db, "user.created", db_user)
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=400, detail="Email already registered")
+        user = UserSnapshot.model_validate(db_user)
+        db.commit()
+        worker_broadcast.emit("search.add", user_id=user.id, name=user.name, email=user.email)
+        event_bus.publish(event)
+        return user
+
+    @timed_stage("service.get_users_page")
+    def get_users_page(self, db: Session, limit: int = 100, after: Optional[int] = None):
+        """Get one page of users ordered by id, starting after the given id"""
+        query = db.query(User).order_by(User.id)
+        if after is not None:
+            query = query.filter(User.id > after)
+        # Fetch one extra row to know whether another page exists
+        users = query.limit(limit + 1).all()
+        next_cursor = users[limit - 1].id if len(users) > limit else None
+        return {"items": users[:limit], "next_cursor": next_cursor}
+
+    def export_users_ndjson(self, batch_size: int = 1000):
+        """
+        Yield every user as NDJSON, one chunk per batch
+
+        Uses its own session and a server-side cursor so memory stays flat
+        however large the table is and the session outlives the request
+        dependencies while the response streams.
+        """
+        db = session()
+        try:
+            rows = (
+                db.query(User.id, User.email, User.name)
+                .order_by(User.id)
+                .execution_options(stream_results=True)
+                .yield_per(batch_size)
+            )
+            chunk = []
+            for row in rows:
+                chunk.append(json.dumps({"id": row.id, "email": row.email, "name": row.name}))
+                if len(chunk) >= batch_size:
+                    yield "\n".join(chunk) + "\n"
+                    chunk = []
+            if chunk:
+                yield "\n".join(chunk) + "\n"
+        finally:
+            db.close()
+
+    @timed_stage("service.search_users")
+    def search_users(self, db: Session, q: str, limit: int = 20, offset: int = 0):
+        """
+        Ranked prefix/substring matches on name and email, one page at a time
+
+        Served from the trigram index when it is loaded (USER_SEARCH_BACKEND=trigram)
+        and the query is long enough for it, else from an index-served prefix
+        query, which finds no substring matches.
+        """
+        if search_index.ready and len(q) >= search_index.min_query_length:
+            items, more = search_index.search(q, limit, offset)
+        else:
+            where, order = search_clauses(q)
+            users = db.query(User).filter(where).order_by(*order).offset(offset).limit(limit + 1).all()
+            items, more = users[:limit], len(users) > limit
+        return {"items": items, "next_offset": offset + limit if more else None}
+
+    def rebuild_search_index(self, batch_size: int = 10000):
+        """Load every user into the in-process search index (app startup)"""
+        db = session()
+        try:
+            rows = (
+                db.query(User.id, User.name, User.email)
+                .execution_options(stream_results=True)
+                .yield_per(batch_size)
+            )
+            search_index.build((row.id, row.name, row.email) for row in rows)
+        finally:
+            db.close()
+        logger.info("Search index loaded with %d users", len(search_index))
+
+    def get_users_page_versions(self, db: Session, limit: int = 100, after: Optional[int] = None):
+        """Get only (id, version) of a page's rows, the watermark behind its ETag"""
+        query = db.query(User.id, User.version).order_by(User.id)
+        if after is not None:
+            query = query.filter(User.id > after)
+        rows = query.limit(limit + 1).all()
+        next_cursor = rows[limit - 1].id if len(rows) > limit else None
+        return {"items": rows[:limit], "next_cursor": next_cursor}
+
+    def get_user_version(self, user_id: int, db: Session):
+        """Get only a user's version, for answering conditional GETs"""
+        version = db.query(User.version).filter(User.id == user_id).scalar()
+        if version is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        return version
+
+    @timed_stage("service.get_user_by_id")
     def get_user_by_id(self, user_id: int, db: Session):
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         return user
 
-    def update_user(self, user_id: int, user_data: UserCreate, db: Session):
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        user.name = user_data.name
-        user.email = user_data.email
-        if user_data.password:
-            user.password = hash_password(user_data.password)
-        
-        db.commit()
-        db.refresh(user)
+    @timed_stage("service.get_users_by_ids")
+    def get_users_by_ids(self, user_ids: List[int], db: Session):
+        """
+        Get many users by id, in request order, plus the ids that do not exist
+
+        Users already loaded in this request's session are reused, then the
+        shared user cache is consulted (USER_BATCH_CACHE=true), and the rest
+        is loaded with one IN query per USER_BATCH_CHUNK_SIZE ids.
+        Duplicate ids are returned once, at their first position.
+        """
+        ids = list(dict.fromkeys(user_ids))
+        found = {}
+        for user_id in ids:
+            user = db.identity_map.get(db.identity_key(User, user_id))
+            if user is not None:
+                found[user_id] = user
+        pending = [user_id for user_id in ids if user_id not in found]
+        if USER_BATCH_CACHE and pending:
+            found.update(user_cache.get_many_by_id(pending))
+            pending = [user_id for user_id in pending if user_id not in found]
+
+        for start in range(0, len(pending), USER_BATCH_CHUNK_SIZE):
+            chunk = pending[start:start + USER_BATCH_CHUNK_SIZE]
+            for user in db.query(User).filter(User.id.in_(chunk)):
+                found[user.id] = user
+                if USER_BATCH_CACHE:
+                    user_cache.set(user)
+
+        return {
+            "items": [found[user_id] for user_id in ids if user_id in found],
+            "missing": [user_id for user_id in ids if user_id not in found],
+        }
+
+    @timed_stage("service.update_user")
+    def update_user(self, user_id: int, user_data: UserUpdate, db: Session):
+        """
+        UPDATE a user in place and return its new (id, email, name, version)
+
+        One UPDATE ... RETURNING where the dialect has it; elsewhere the
+        rowcount tells whether the user exists and the new row is read back.
+        A password is optional: only a supplied one is hashed (without
+        reading the old hash) and revokes every session of the user in the
+        same transaction, so renaming a user does not sign them out.
+        """
+        password = hash_password(user_data.password) if user_data.password else None
+        statement = user_update_statement(user_id, user_data, password)
+        try:
+            if supports_returning(db, "update"):
+                user = db.execute(statement.returning(*USER_ROW)).first()
+            elif db.execute(statement).rowcount:
+                user = db.execute(select(*USER_ROW).where(User.id == user_id)).first()
+            else:
+                user = None
+            if user is None:
+                raise HTTPException(status_code=404, detail="User not found")
+            session_ids = session_service.revoke_user_sessions(db, user_id) if password else []
+            event = record_event(db, "user.updated", user)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=400, detail="Email already registered")
+        session_service.revoked(session_ids)
+        self.forget_user(user.id, user.email)
+        worker_broadcast.emit("search.add", user_id=user.id, name=user.name, email=user.email)
+        event_bus.publish(event)
         return user
 
+    @timed_stage("service.delete_user")
     def delete_user(self, user_id: int, db: Session):
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
+        """DELETE a user, with RETURNING where available so the event needs no prior SELECT"""
+        statement = delete(User).where(User.id == user_id).execution_options(synchronize_session=False)
+        if supports_returning(db, "delete"):
+            user = db.execute(statement.returning(*USER_ROW)).first()
+        else:
+            user = db.execute(select(*USER_ROW).where(User.id == user_id)).first()
+            if user is not None:
+                db.execute(statement)
+        if user is None:
             raise HTTPException(status_code=404, detail="User not found")
-        
-        db.delete(user)
+        session_ids = session_service.revoke_user_sessions(db, user.id)
+        event = record_event(db, "user.deleted", user)
         db.commit()
+        session_service.revoked(session_ids)
+        self.forget_user(user.id, user.email)
+        worker_broadcast.emit("search.remove", user_id=user.id)
+        event_bus.publish(event)
         return {"message": "User deleted successfully"}
 
-    def generate_token_response(self, user):
-        """Generate JWT token response"""
-        access_token = create_access_token(
-            data={"sub": user.email},
-            expires_delta=timedelta(hours=24)
-        )
-        
+    def forget_user(self, user_id: int, email: str):
+        """Drop cached tokens and snapshots of a user, in this and every sibling worker"""
+        worker_broadcast.emit("user.forget", user_id=user_id, email=email)
+
+    def generate_token_response(self, user, db: Session):
+        """Start a login session for user and return its access and refresh tokens"""
+        # Snapshot first: committing the refresh token expires ORM attributes
+        user = UserSnapshot.model_validate(user)
+        session_id, refresh_token = session_service.start_session(db, user.id)
+        return self.token_response(user, session_id, refresh_token)
+
+    def token_response(self, user, session_id: str, refresh_token: str):
+        """Short-lived access token for a session, with the session's current refresh token"""
+        access_token = create_access_token(data={"sub": str(user.id), "sid": session_id})
+
         return {
             "access_token": access_token,
             "token_type": "bearer",
-            "expires_in": 86400,  # 24 hours
+            "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+            "refresh_token": refresh_token,
             "user": user
-        }
\ No newline at end of file
+        }
+
+    def refresh_session(self, refresh_token: str, db: Session):
+        """Exchange a refresh token for new access and refresh tokens"""
+        session_id, new_refresh_token, user = session_service.rotate(db, refresh_token)
+        return self.token_response(user, session_id, new_refresh_token)
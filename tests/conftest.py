@@ -0,0 +1,32 @@
+import os
+import tempfile
+import uuid
+import pytest
+
+# Settings are read at import time, so point the app at a throwaway SQLite file first
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='user-api-test-'), 'test.db')}"
+)
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+PASSWORD = "test-password"
+
+@pytest.fixture(scope="session")
+def client():
+    """TestClient with the app lifespan running (engines, caches, event bus)"""
+    from fastapi.testclient import TestClient
+    from config.database import create_tables
+    from main import app
+
+    create_tables()
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def account(client):
+    """A freshly registered user: (user dict, auth headers, token response)"""
+    email = f"{uuid.uuid4().hex[:12]}@test.local"
+    response = client.post("/users/register", json={"email": email, "name": "Test User", "password": PASSWORD})
+    assert response.status_code == 201, response.text
+    token = response.json()
+    return token["user"], {"Authorization": f"Bearer {token['access_token']}"}, token
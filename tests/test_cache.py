@@ -0,0 +1,95 @@
+import uuid
+from conftest import PASSWORD
+from utils.cache import TokenCache, UserCache, token_cache, user_cache
+
+def cached(token):
+    return token_cache.get_claims(token["access_token"]) is not None
+
+def test_verified_tokens_are_cached_until_exp():
+    cache = TokenCache(ttl=300)
+    cache.set_claims("a", {"sub": "1", "exp": 0})
+    assert cache.get_claims("a") is None
+    cache.set_claims("b", {"sub": "1", "exp": 2 ** 40})
+    cache.set_claims("c", {"sub": "2", "exp": 2 ** 40})
+    assert cache.get_claims("b") == {"sub": "1", "exp": 2 ** 40}
+
+    cache.invalidate_subject(1)
+    assert cache.get_claims("b") is None
+    assert cache.get_claims("c") is not None
+
+def test_token_cache_is_dropped_on_update(client, account):
+    user, headers, token = account
+    assert client.get(f"/users/{user['id']}", headers=headers).status_code == 200
+    assert cached(token)
+
+    client.put(f"/users/{user['id']}", json={"email": user["email"], "name": "Renamed"}, headers=headers)
+    assert not cached(token)
+    # The token is still valid, so the next request verifies and caches it again
+    assert client.get(f"/users/{user['id']}", headers=headers).status_code == 200
+    assert cached(token)
+
+def test_token_cache_is_dropped_on_password_change(client, account):
+    user, headers, token = account
+    client.get(f"/users/{user['id']}", headers=headers)
+    assert cached(token)
+
+    body = {"email": user["email"], "name": user["name"], "password": PASSWORD + "-new"}
+    assert client.put(f"/users/{user['id']}", json=body, headers=headers).status_code == 200
+    assert not cached(token)
+    assert client.get(f"/users/{user['id']}", headers=headers).status_code == 401
+
+def test_token_cache_is_dropped_on_delete(client, account):
+    user, headers, token = account
+    client.get(f"/users/{user['id']}", headers=headers)
+    assert cached(token)
+
+    assert client.delete(f"/users/{user['id']}", headers=headers).status_code == 200
+    assert not cached(token)
+    assert client.get(f"/users/{user['id']}", headers=headers).status_code == 401
+
+def test_user_cache_keys_by_id_and_email():
+    cache = UserCache()
+    user = {"id": 7, "email": "old@test.local", "name": "Old", "is_active": True}
+    cache.set(user)
+    assert cache.get("old@test.local").id == 7
+    assert cache.get_many_by_id([7, 8]).keys() == {7}
+
+    # Dropping by id also drops the email it was cached under
+    cache.invalidate_id(7)
+    assert cache.get_by_id(7) is None
+    assert cache.get("old@test.local") is None
+
+def test_user_cache_is_dropped_on_update(client, account):
+    user, headers, _ = account
+    client.get(f"/users/{user['id']}", headers=headers)
+    assert user_cache.get_by_id(user["id"]).email == user["email"]
+
+    email = f"{uuid.uuid4().hex[:12]}@test.local"
+    response = client.put(f"/users/{user['id']}", json={"email": email, "name": "Renamed"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert user_cache.get_by_id(user["id"]) is None
+    assert user_cache.get(user["email"]) is None
+
+    # The next authenticated request caches the new snapshot
+    assert client.get(f"/users/{user['id']}", headers=headers).json()["name"] == "Renamed"
+    assert user_cache.get_by_id(user["id"]).name == "Renamed"
+    assert user_cache.get(email).id == user["id"]
+
+def test_user_cache_is_dropped_on_password_change(client, account):
+    user, headers, _ = account
+    client.get(f"/users/{user['id']}", headers=headers)
+    assert user_cache.get_by_id(user["id"]) is not None
+
+    body = {"email": user["email"], "name": user["name"], "password": PASSWORD + "-new"}
+    assert client.put(f"/users/{user['id']}", json=body, headers=headers).status_code == 200
+    assert user_cache.get_by_id(user["id"]) is None
+    assert user_cache.get(user["email"]) is None
+
+def test_user_cache_is_dropped_on_delete(client, account):
+    user, headers, _ = account
+    client.get(f"/users/{user['id']}", headers=headers)
+    assert user_cache.get_by_id(user["id"]) is not None
+
+    assert client.delete(f"/users/{user['id']}", headers=headers).status_code == 200
+    assert user_cache.get_by_id(user["id"]) is None
+    assert user_cache.get(user["email"]) is None
@@ -0,0 +1,62 @@
+import uuid
+
+def conditional_get(client, url, headers, etag, **params):
+    return client.get(url, params=params, headers={**headers, "If-None-Match": etag})
+
+def test_user_etag_answers_304_until_the_user_changes(client, account):
+    user, headers, _ = account
+    url = f"/users/{user['id']}"
+    response = client.get(url, headers=headers)
+    etag = response.headers["ETag"]
+
+    not_modified = conditional_get(client, url, headers, etag)
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag
+    assert not_modified.content == b""
+    # Weak comparison, lists of tags and "*" all match
+    assert conditional_get(client, url, headers, f'"other", W/{etag}').status_code == 304
+    assert conditional_get(client, url, headers, "*").status_code == 304
+    assert conditional_get(client, url, headers, '"other"').status_code == 200
+
+    client.put(url, json={"email": user["email"], "name": "Renamed"}, headers=headers)
+    response = conditional_get(client, url, headers, etag)
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed"
+    assert response.headers["ETag"] != etag
+    assert conditional_get(client, url, headers, response.headers["ETag"]).status_code == 304
+
+def test_conditional_get_of_a_missing_user_is_404(client, account):
+    _, headers, _ = account
+    assert conditional_get(client, "/users/999999", headers, '"user-999999-v1"').status_code == 404
+
+def test_page_etag_follows_the_rows_on_the_page(client, account):
+    user, headers, _ = account
+    page = {"limit": 1, "after": user["id"] - 1}
+    response = client.get("/users/", params=page, headers=headers)
+    assert [item["id"] for item in response.json()["items"]] == [user["id"]]
+    etag = response.headers["ETag"]
+
+    assert conditional_get(client, "/users/", headers, etag, **page).status_code == 304
+    # Other paging parameters are another page, with another tag
+    other = conditional_get(client, "/users/", headers, etag, limit=2, after=user["id"] - 1)
+    assert other.status_code == 200
+    assert other.headers["ETag"] != etag
+
+    client.put(f"/users/{user['id']}", json={"email": user["email"], "name": "Renamed"}, headers=headers)
+    response = conditional_get(client, "/users/", headers, etag, **page)
+    assert response.status_code == 200
+    assert response.json()["items"][0]["name"] == "Renamed"
+    assert response.headers["ETag"] != etag
+
+def test_page_etag_changes_when_a_row_is_added(client, account):
+    user, headers, _ = account
+    # The newest user is last, so the page past it is the tail of the table
+    page = {"limit": 10, "after": user["id"]}
+    etag = client.get("/users/", params=page, headers=headers).headers["ETag"]
+    assert conditional_get(client, "/users/", headers, etag, **page).status_code == 304
+
+    email = f"{uuid.uuid4().hex[:12]}@test.local"
+    created = client.post("/users/register", json={"email": email, "name": "Newcomer", "password": "test-password"})
+    response = conditional_get(client, "/users/", headers, etag, **page)
+    assert response.status_code == 200
+    assert created.json()["user"]["id"] in [item["id"] for item in response.json()["items"]]
@@ -0,0 +1,102 @@
+import uuid
+import pytest
+from fastapi import HTTPException
+from config.database import get_db
+from middlewares import rate_limit
+from middlewares.rate_limit import InMemoryRateLimitStore, LoginRateLimiter
+from utils.hash_pool import hash_pool
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+def retry_after(limiter, ip, email):
+    with pytest.raises(HTTPException) as exc_info:
+        limiter.check(ip, email)
+    assert exc_info.value.status_code == 429
+    return int(exc_info.value.headers["Retry-After"])
+
+def test_per_email_bucket_runs_out_and_refills(clock):
+    limiter = LoginRateLimiter(per_ip=100, per_email=2, window=60)
+    limiter.check("10.0.0.1", "a@test.local")
+    limiter.check("10.0.0.2", "a@test.local")
+    # A new IP does not help against an exhausted account
+    assert retry_after(limiter, "10.0.0.3", "a@test.local") == 30
+    limiter.check("10.0.0.3", "b@test.local")
+
+    clock.now += 29
+    assert retry_after(limiter, "10.0.0.4", "a@test.local") == 1
+    clock.now += 1
+    limiter.check("10.0.0.4", "a@test.local")
+
+def test_per_ip_bucket_runs_out_and_refills(clock):
+    limiter = LoginRateLimiter(per_ip=3, per_email=100, window=60)
+    for n in range(3):
+        limiter.check("10.0.0.1", f"{n}@test.local")
+    # ...across every email, and without an email (malformed body) too
+    assert retry_after(limiter, "10.0.0.1", "new@test.local") == 20
+    assert retry_after(limiter, "10.0.0.1", None) == 20
+    limiter.check("10.0.0.2", "new@test.local")
+
+    clock.now += 60
+    for n in range(3):
+        limiter.check("10.0.0.1", f"{n}@test.local")
+    retry_after(limiter, "10.0.0.1", "new@test.local")
+
+def test_idle_keys_are_evicted(clock):
+    store = InMemoryRateLimitStore(max_keys=2)
+    for key in ("a", "b", "c"):
+        store.consume(key, 1, 1)
+    assert len(store) == 2
+    # "a" was evicted, so it starts again from a full bucket
+    assert store.consume("a", 1, 1) == (True, 0.0)
+
+def test_rejected_login_skips_the_database_and_bcrypt(client, monkeypatch):
+    email = f"{uuid.uuid4().hex[:12]}@test.local"
+    response = client.post("/users/register", json={"email": email, "name": "Limited", "password": "test-password"})
+    assert response.status_code == 201, response.text
+    monkeypatch.setattr(rate_limit.login_rate_limiter, "store", InMemoryRateLimitStore())
+    monkeypatch.setattr(rate_limit.login_rate_limiter, "per_ip", 4)
+    monkeypatch.setattr(rate_limit.login_rate_limiter, "per_email", 2)
+
+    sessions, hashes = [], []
+
+    def counting_get_db():
+        sessions.append(1)
+        yield from get_db()
+
+    run = hash_pool.run
+
+    async def counting_run(fn, *args):
+        hashes.append(fn)
+        return await run(fn, *args)
+
+    monkeypatch.setitem(client.app.dependency_overrides, get_db, counting_get_db)
+    monkeypatch.setattr(hash_pool, "run", counting_run)
+
+    def login(address):
+        return client.post("/users/login", json={"email": address, "password": "wrong-password"})
+
+    assert [login(email).status_code for _ in range(2)] == [401, 401]
+    assert (len(sessions), len(hashes)) == (2, 2)
+
+    response = login(email)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert (len(sessions), len(hashes)) == (2, 2)
+
+    # The fourth attempt from this IP is allowed for another account, the fifth is not
+    assert login("someone-else@test.local").status_code == 401
+    response = login("third@test.local")
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+    assert len(sessions) == 3
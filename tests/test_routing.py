@@ -0,0 +1,122 @@
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import Session
+from config.database import base
+from config.routing import ReplicaSet, RoutingSession
+from models.models import User
+
+@pytest.fixture
+def engines(tmp_path):
+    """(primary, replica): two SQLite files with the same schema but separate data"""
+    primary, replica = (create_engine(f"sqlite:///{tmp_path / name}.db") for name in ("primary", "replica"))
+    for engine in (primary, replica):
+        base.metadata.create_all(engine)
+    yield primary, replica
+    primary.dispose()
+    replica.dispose()
+
+class StubLag:
+    """Lag probe reporting whatever the test sets, per engine"""
+
+    def __init__(self):
+        self.lag = {}
+        self.calls = 0
+
+    def __call__(self, engine):
+        self.calls += 1
+        lag = self.lag.get(engine, 0.0)
+        if isinstance(lag, Exception):
+            raise lag
+        return lag
+
+def routing_session(primary, replica_set):
+    return RoutingSession(primary=primary, replica_set=replica_set)
+
+def test_round_robin_and_least_connections(engines, tmp_path):
+    primary, replica = engines
+    other = create_engine(f"sqlite:///{tmp_path / 'other'}.db")
+    replicas = ReplicaSet([replica, other], lag_probe=StubLag())
+    assert [replicas.choose() for _ in range(4)] == [replica, other, replica, other]
+
+    replicas = ReplicaSet([replica, other], strategy="least_connections", lag_probe=StubLag())
+    with replica.connect():
+        assert replicas.choose() is other
+    with other.connect():
+        assert replicas.choose() is replica
+    other.dispose()
+
+    with pytest.raises(ValueError):
+        ReplicaSet([replica], strategy="random")
+
+def test_reads_stick_to_one_replica(engines):
+    primary, replica = engines
+    with Session(replica) as seed:
+        seed.add(User(email="replica@test.local", name="Replica"))
+        seed.commit()
+
+    with routing_session(primary, ReplicaSet([replica], lag_probe=StubLag())) as session:
+        assert session.scalars(select(User.email)).all() == ["replica@test.local"]
+        assert session.get_bind(clause=select(User)) is replica
+
+def test_flush_pins_the_session_to_the_primary(engines):
+    primary, replica = engines
+    with routing_session(primary, ReplicaSet([replica], lag_probe=StubLag())) as session:
+        assert session.get_bind(clause=select(User)) is replica
+        session.add(User(email="written@test.local", name="Written"))
+        session.flush()
+        # The read after the write sees it: it goes to the primary, not the replica
+        assert session.scalars(select(User.email)).all() == ["written@test.local"]
+        assert session.get_bind(clause=select(User)) is primary
+        session.commit()
+    with replica.connect() as conn:
+        assert conn.scalars(select(User.email)).all() == []
+
+@pytest.mark.parametrize("statement", [
+    update(User).values(name="x"),
+    select(User).with_for_update(),
+], ids=["update", "for_update"])
+def test_writes_and_locking_reads_go_to_the_primary(engines, statement):
+    primary, replica = engines
+    with routing_session(primary, ReplicaSet([replica], lag_probe=StubLag())) as session:
+        assert session.get_bind(clause=statement) is primary
+        # ...and every later read follows it there
+        assert session.get_bind(clause=select(User)) is primary
+
+def test_lagging_or_failing_replicas_fall_back_to_the_primary(engines):
+    primary, replica = engines
+    probe = StubLag()
+    replicas = ReplicaSet([replica], max_lag=5.0, check_interval=0.0, lag_probe=probe)
+
+    probe.lag[replica] = 30.0
+    assert replicas.choose() is None
+    with routing_session(primary, replicas) as session:
+        assert session.get_bind(clause=select(User)) is primary
+
+    probe.lag[replica] = ConnectionError("replica down")
+    assert replicas.choose() is None
+
+    probe.lag[replica] = 1.0
+    assert replicas.choose() is replica
+    with routing_session(primary, replicas) as session:
+        assert session.get_bind(clause=select(User)) is replica
+
+def test_lag_is_probed_once_per_interval(engines):
+    _, replica = engines
+    probe = StubLag()
+    replicas = ReplicaSet([replica], check_interval=60.0, lag_probe=probe)
+    for _ in range(5):
+        replicas.choose()
+    assert probe.calls == 1
+
+    # A lagging result sticks until the next probe
+    probe.lag[replica] = 30.0
+    assert replicas.choose() is replica
+    replicas._checked_at = 0.0
+    assert replicas.choose() is None
+
+def test_without_replicas_everything_uses_the_primary(engines):
+    primary, _ = engines
+    with routing_session(primary, None) as session:
+        assert session.get_bind(clause=select(User)) is primary
+    with pytest.raises(RuntimeError):
+        RoutingSession().get_bind(clause=select(User))
@@ -0,0 +1,89 @@
+from utils.search_index import TrigramIndex, match_rank
+
+ROWS = [
+    (1, "Anna Smith", "anna@test.local"),
+    (2, "Annabel Lee", "annabel@test.local"),
+    (3, "Joanna Anna", "jo@test.local"),
+    (4, "Hannah Brown", "hb@test.local"),
+    (5, "Bob Jones", "bob@test.local"),
+]
+
+def ids(index, query, **kwargs):
+    page, _ = index.search(query, **kwargs)
+    return [item["id"] for item in page]
+
+def built(rows=ROWS, compact_ratio=1.0):
+    index = TrigramIndex(compact_ratio=compact_ratio)
+    index.build(rows)
+    return index
+
+def test_match_rank():
+    assert match_rank("anna@test.local", "anna smith", "anna@test.local") == 0
+    assert match_rank("ann", "anna smith", "anna@test.local") == 1
+    assert match_rank("smi", "anna smith", "anna@test.local") == 2
+    assert match_rank("nna", "anna smith", "x@test.local") == 3
+    assert match_rank("zzz", "anna smith", "anna@test.local") is None
+
+def test_ranks_prefixes_before_word_prefixes_before_substrings():
+    index = built()
+    # Prefixes (shorter names first), then the word prefix in "joanna anna", then the substring
+    assert ids(index, "anna") == [1, 2, 3, 4]
+    assert ids(index, "ANNA") == [1, 2, 3, 4]
+    assert ids(index, "anna@test.local") == [1]
+    assert ids(index, "xyz") == []
+
+def test_pages_through_results():
+    index = built()
+    page, more = index.search("anna", limit=2)
+    assert [item["id"] for item in page] == [1, 2]
+    assert more
+    page, more = index.search("anna", limit=2, offset=2)
+    assert [item["id"] for item in page] == [3, 4]
+    assert not more
+    assert page[0] == {"id": 3, "name": "Joanna Anna", "email": "jo@test.local"}
+
+def test_updates_and_removals_are_searchable_at_once():
+    index = built(compact_ratio=10.0)
+    index.add(5, "Bobby Annabelle", "bob@test.local")
+    assert 5 in ids(index, "anna")
+    # The old text no longer matches, although its postings are still there
+    assert ids(index, "jones") == []
+
+    index.remove(1)
+    assert 1 not in ids(index, "anna")
+    index.add(6, "Anna New", "new@test.local")
+    assert ids(index, "anna new") == [6]
+    assert len(index) == 5
+
+def test_compaction_drops_stale_postings():
+    index = built(compact_ratio=10.0)
+    index.add(5, "Robert", "bob@test.local")
+    index.remove(4)
+    assert index._stale == 2
+    assert 4 in index._postings["han"]
+
+    index.compact()
+    assert index._stale == 0
+    assert "han" not in index._postings
+    assert "jon" not in index._postings
+    assert ids(index, "anna") == [1, 2, 3]
+    assert ids(index, "robert") == [5]
+
+def test_compacts_once_stale_entries_outnumber_live_documents():
+    index = built(rows=ROWS[:2], compact_ratio=1.0)
+    index.add(1, "Anna Renamed", "anna@test.local")
+    index.add(1, "Anna Again", "anna@test.local")
+    assert index._stale == 2
+    # A third stale entry crosses len(docs) * compact_ratio
+    index.remove(2)
+    assert index._stale == 0
+    assert "bel" not in index._postings
+    assert ids(index, "anna") == [1]
+
+def test_ignores_writes_until_built():
+    index = TrigramIndex()
+    index.add(1, "Anna", "anna@test.local")
+    assert len(index) == 0
+    index.build(ROWS)
+    assert index.ready
+    assert len(index) == len(ROWS)
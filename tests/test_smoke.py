@@ -0,0 +1,65 @@
+def test_app_imports():
+    import main
+
+    assert "/users/login" in main.app.openapi()["paths"]
+
+def test_startup_and_health(client):
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json() == {"status": "healthy"}
+
+def test_pool_checkout_is_timed_on_first_statement(client):
+    from sqlalchemy import text
+    from config.database import engine, pool_checkout_seconds, session
+
+    assert type(engine.pool).__name__.startswith("Timed")
+    checkouts = lambda: sum(sum(state[:-1]) for state in pool_checkout_seconds._values.values())
+    before = checkouts()
+    db = session()
+    try:
+        assert checkouts() == before
+        db.execute(text("SELECT 1"))
+        assert checkouts() == before + 1
+    finally:
+        db.close()
+
+def test_sync_stack_does_not_import_the_asyncio_extension():
+    import os
+    import subprocess
+    import sys
+
+    env = {key: value for key, value in os.environ.items() if key != "DB_ASYNC"}
+    code = "import sys, main; print(sorted(m for m in ('sqlalchemy.ext.asyncio', 'greenlet') if m in sys.modules))"
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+    assert completed.stdout.strip() == "[]"
+
+def test_password_hash_calibration_is_reused_from_the_environment(monkeypatch):
+    from utils import secure
+
+    calls = []
+    monkeypatch.delenv("BCRYPT_ROUNDS")
+    monkeypatch.setattr(secure, "calibrate_bcrypt_rounds", lambda target_ms: calls.append(target_ms) or 4)
+    # The serve parent calibrates; forked workers find the result in the environment
+    assert secure.calibrate_password_hashing(target_ms=250)["bcrypt__default_rounds"] == 4
+    assert secure.calibrate_password_hashing(target_ms=250)["bcrypt__default_rounds"] == 4
+    assert calls == [250]
+
+def test_upgrade_schema_adds_the_version_column(tmp_path):
+    from sqlalchemy import create_engine, inspect, text
+    from config.database import base, upgrade_schema
+    import models.models  # noqa: F401
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        # users as created before the version column existed
+        conn.exec_driver_sql("CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR(255), name VARCHAR(255), password VARCHAR(255))")
+        conn.exec_driver_sql("INSERT INTO users (email, name, password) VALUES ('old@test.local', 'Old', 'x')")
+    base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    upgrade_schema(engine)  # idempotent
+
+    assert "version" in {column["name"] for column in inspect(engine).get_columns("users")}
+    assert {"ix_users_email", "ix_users_name"} <= {index["name"] for index in inspect(engine).get_indexes("users")}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version FROM users")).scalar_one() == 1
+    engine.dispose()
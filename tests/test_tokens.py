@@ -0,0 +1,80 @@
+import base64
+import json
+import time
+import jwt
+import pytest
+from utils.tokens import KeyRing, TokenVerifier
+
+# HS256 keys of at least 32 bytes, so PyJWT does not warn
+OLD, NEW, GONE = "old-" + "o" * 32, "new-" + "n" * 32, "gone-" + "g" * 32
+
+def b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def unsigned(claims, alg="none"):
+    header = b64(json.dumps({"alg": alg, "typ": "JWT"}).encode())
+    return f"{header}.{b64(json.dumps(claims).encode())}."
+
+@pytest.fixture
+def keyring():
+    return KeyRing({"old": OLD, "new": NEW}, active_kid="new")
+
+@pytest.fixture
+def verifier(keyring):
+    return TokenVerifier(keyring)
+
+def test_verifies_tokens_from_any_key_on_the_ring(keyring, verifier):
+    assert verifier.verify(keyring.sign({"sub": "1"}))["sub"] == "1"
+    retired = KeyRing({"old": OLD}).sign({"sub": "2"})
+    assert verifier.verify(retired)["sub"] == "2"
+
+def test_rejects_unknown_or_removed_key_ids(keyring):
+    token = KeyRing({"gone": GONE}).sign({"sub": "1"})
+    with pytest.raises(jwt.InvalidSignatureError):
+        TokenVerifier(keyring).verify(token)
+    # A key taken off the ring stops verifying its tokens
+    old_token = KeyRing({"old": OLD}).sign({"sub": "1"})
+    with pytest.raises(jwt.InvalidSignatureError):
+        TokenVerifier(KeyRing({"new": NEW})).verify(old_token)
+
+@pytest.mark.parametrize("tamper", [
+    lambda token: token + "!!",
+    lambda token: token + "==",
+    lambda token: token[:-1] + ("A" if token[-1] != "A" else "B"),
+    lambda token: token.replace(".", ".\n", 1),
+    lambda token: token + ".extra",
+])
+def test_rejects_tampered_and_padded_signatures(keyring, verifier, tamper):
+    token = keyring.sign({"sub": "1"})
+    with pytest.raises(jwt.InvalidTokenError):
+        verifier.verify(tamper(token))
+    # PyJWT agrees on every variant
+    with pytest.raises(jwt.InvalidTokenError):
+        jwt.decode(tamper(token), NEW, algorithms=["HS256"])
+
+def test_rejects_non_canonical_signature_spelling(keyring, verifier):
+    token = keyring.sign({"sub": "1"})
+    head, _, signature = token.rpartition(".")
+    # 32 bytes leave two unused bits in the last character; flipping them keeps the bytes
+    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+    last = alphabet.index(signature[-1])
+    respelled = f"{head}.{signature[:-1]}{alphabet[last ^ 1]}"
+    with pytest.raises(jwt.DecodeError):
+        verifier.verify(respelled)
+
+def test_rejects_alg_none(verifier):
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        verifier.verify(unsigned({"sub": "1"}))
+
+def test_enforces_exp_nbf_and_iat(keyring, verifier):
+    now = int(time.time())
+    with pytest.raises(jwt.ExpiredSignatureError):
+        verifier.verify(keyring.sign({"sub": "1", "exp": now - 10}))
+    with pytest.raises(jwt.ImmatureSignatureError):
+        verifier.verify(keyring.sign({"sub": "1", "nbf": now + 60}))
+    with pytest.raises(jwt.ImmatureSignatureError):
+        verifier.verify(keyring.sign({"sub": "1", "iat": now + 60}))
+    with pytest.raises(jwt.DecodeError):
+        verifier.verify(keyring.sign({"sub": "1", "nbf": "soon"}))
+    assert verifier.verify(keyring.sign({"sub": "1", "nbf": now - 1, "exp": now + 60}))["sub"] == "1"
+    assert TokenVerifier(keyring, leeway=120).verify(keyring.sign({"sub": "1", "nbf": now + 60}))["sub"] == "1"
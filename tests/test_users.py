@@ -0,0 +1,222 @@
+import uuid
+from conftest import PASSWORD
+
+def test_register_and_login(client, account):
+    user, _, _ = account
+    response = client.post("/users/login", json={"email": user["email"].upper(), "password": PASSWORD})
+    assert response.status_code == 200, response.text
+    assert response.json()["user"]["id"] == user["id"]
+
+def test_login_rejects_wrong_password(client, account):
+    user, _, _ = account
+    response = client.post("/users/login", json={"email": user["email"], "password": "wrong-password"})
+    assert response.status_code == 401
+
+def test_duplicate_registration(client, account):
+    user, _, _ = account
+    response = client.post("/users/register", json={"email": user["email"], "name": "Again", "password": PASSWORD})
+    assert response.status_code == 400
+
+def test_requires_authentication(client):
+    assert client.get("/users/1").status_code in (401, 403)
+
+def test_get_list_batch_and_search(client, account):
+    user, headers, _ = account
+    response = client.get(f"/users/{user['id']}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["email"] == user["email"]
+    assert client.get("/users/999999", headers=headers).status_code == 404
+
+    page = client.get("/users/", params={"limit": 1000}, headers=headers).json()
+    assert user["id"] in [item["id"] for item in page["items"]]
+
+    batch = client.post("/users/batch", json={"ids": [user["id"], 999999]}, headers=headers).json()
+    assert [item["id"] for item in batch["items"]] == [user["id"]]
+    assert batch["missing"] == [999999]
+
+    found = client.get("/users/search", params={"q": user["email"][:8]}, headers=headers).json()
+    assert user["id"] in [item["id"] for item in found["items"]]
+
+def test_sql_search_matches_prefixes_only(client, account):
+    user, headers, _ = account
+    name = f"Zed {uuid.uuid4().hex[:10]}"
+    client.put(f"/users/{user['id']}", json={"email": user["email"], "name": name}, headers=headers)
+
+    def found(q):
+        response = client.get("/users/search", params={"q": q}, headers=headers)
+        assert response.status_code == 200, response.text
+        return [item["id"] for item in response.json()["items"]]
+
+    assert user["id"] in found(name[:8].upper())
+    assert user["id"] in found(user["email"])
+    # Substrings need the trigram backend
+    assert user["id"] not in found(name[4:12])
+
+def test_update_and_delete(client, account):
+    user, headers, token = account
+    response = client.put(f"/users/{user['id']}", json={"email": user["email"], "name": "Renamed"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["name"] == "Renamed"
+    # Without a password the update keeps every session, and the password, as they were
+    assert client.get(f"/users/{user['id']}", headers=headers).status_code == 200
+    assert client.post("/users/refresh", json={"refresh_token": token["refresh_token"]}).status_code == 200
+    assert client.post("/users/login", json={"email": user["email"], "password": PASSWORD}).status_code == 200
+
+    assert client.delete(f"/users/{user['id']}", headers=headers).status_code == 200
+    assert client.get(f"/users/{user['id']}", headers=headers).status_code == 401
+
+def test_refresh_rotates_tokens(client, account):
+    _, _, token = account
+    response = client.post("/users/refresh", json={"refresh_token": token["refresh_token"]})
+    assert response.status_code == 200, response.text
+    assert response.json()["refresh_token"] != token["refresh_token"]
+
+    # The exchanged token is single use; presenting it again revokes the session
+    assert client.post("/users/refresh", json={"refresh_token": token["refresh_token"]}).status_code == 401
+    refreshed = response.json()
+    assert client.post("/users/refresh", json={"refresh_token": refreshed["refresh_token"]}).status_code == 401
+    headers = {"Authorization": f"Bearer {refreshed['access_token']}"}
+    assert client.get(f"/users/{token['user']['id']}", headers=headers).status_code == 401
+
+def test_refresh_after_password_change_is_rejected(client, account):
+    user, headers, token = account
+    response = client.put(
+        f"/users/{user['id']}", json={"email": user["email"], "name": user["name"], "password": PASSWORD}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    # Setting the password revokes every session of the user
+    assert client.get(f"/users/{user['id']}", headers=headers).status_code == 401
+    assert client.post("/users/refresh", json={"refresh_token": token["refresh_token"]}).status_code == 401
+
+def test_cold_user_cache_burst_does_not_exhaust_the_pool(client, account):
+    import asyncio
+    import httpx
+    from main import app
+    from utils.cache import user_cache
+
+    user, headers, _ = account
+    user_cache.invalidate_id(user["id"])
+
+    async def burst():
+        # More concurrent requests than the threadpool has threads and the pool has connections
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            requests = (http.get(f"/users/{user['id']}", headers=headers) for _ in range(200))
+            return await asyncio.wait_for(asyncio.gather(*requests), 20)
+
+    responses = asyncio.run(burst())
+    assert {response.status_code for response in responses} == {200}
+
+def test_bulk_import(client, account):
+    _, headers, _ = account
+    emails = [f"{uuid.uuid4().hex[:12]}@test.local" for _ in range(3)]
+    body = "\n".join(f'{{"email": "{email}", "name": "Bulk User", "password": "{PASSWORD}"}}' for email in emails)
+    body += '\n{"email": "not-an-email", "name": "Bad", "password": "x"}\n'
+    response = client.post(
+        "/users/bulk", params={"batch_size": 2}, content=body,
+        headers={**headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["total"], result["created"], result["failed"]) == (4, 3, 1)
+    assert client.post("/users/login", json={"email": emails[0], "password": PASSWORD}).status_code == 200
+
+def test_bulk_import_reports_non_string_emails(client, account):
+    _, headers, _ = account
+    body = '{"email": 123, "name": "Bad", "password": "x"}\n{"email": ["a"]}\n["not", "an", "object"]\n'
+    response = client.post("/users/bulk", content=body, headers={**headers, "Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200, response.text
+    assert [(row["status"], row["email"]) for row in response.json()["results"]] == [("invalid", None)] * 3
+
+def test_async_controller_serves_the_same_routes():
+    from controllers.async_user_controller import router as async_router
+    from controllers.user_controller import router as sync_router
+
+    def table(router):
+        return {(method, route.path) for route in router.routes for method in route.methods}
+
+    assert table(async_router) == table(sync_router)
+
+def test_bulk_import_records_outbox_events(client, account):
+    import asyncio
+    from datetime import datetime, timedelta
+    from config.database import session
+    from models.models import User, UserEvent
+    from services.event_bus import EventBus
+
+    _, headers, _ = account
+    emails = [f"{uuid.uuid4().hex[:12]}@test.local" for _ in range(2)]
+    body = "".join(f'{{"email": "{email}", "name": "Bulk User", "password": "{PASSWORD}"}}\n' for email in emails)
+    response = client.post("/users/bulk", content=body, headers={**headers, "Content-Type": "application/x-ndjson"})
+    assert response.json()["created"] == 2, response.text
+
+    db = session()
+    try:
+        ids = [id for (id,) in db.query(User.id).filter(User.email.in_(emails))]
+        events = db.query(UserEvent).filter(UserEvent.user_id.in_(ids), UserEvent.event_type == "user.created").all()
+        assert sorted(event.user_id for event in events) == sorted(ids)
+
+        # Dispatched rows past the retention period are pruned, pending ones are kept
+        events[0].dispatched_at = datetime.utcnow() - timedelta(hours=2)
+        events[1].dispatched_at = None
+        db.commit()
+        event_ids = [event.id for event in events]
+        assert asyncio.run(EventBus(retention_hours=1).prune()) >= 1
+        assert [id for (id,) in db.query(UserEvent.id).filter(UserEvent.id.in_(event_ids))] == event_ids[1:]
+    finally:
+        db.close()
+
+def test_rehash_is_stored_off_the_hash_workers(client, account, monkeypatch):
+    import threading
+    from config.database import session
+    from models.models import User
+    from services import user_services
+    from services.user_services import UserService
+
+    user, _, _ = account
+    stored = threading.Event()
+    threads = []
+    store = UserService._store_rehash
+
+    def spy(self, *args):
+        threads.append(threading.current_thread().name)
+        store(self, *args)
+        stored.set()
+
+    monkeypatch.setattr(user_services, "password_needs_rehash", lambda hashed: True)
+    monkeypatch.setattr(UserService, "_store_rehash", spy)
+    db = session()
+    try:
+        old_hash = db.query(User.password).filter(User.id == user["id"]).scalar()
+        assert client.post("/users/login", json={"email": user["email"], "password": PASSWORD}).status_code == 200
+        assert stored.wait(10)
+        assert threads and all(name.startswith("rehash-store") for name in threads)
+        assert db.query(User.password).filter(User.id == user["id"]).scalar() != old_hash
+    finally:
+        db.close()
+
+def test_expired_refresh_tokens_are_pruned(client):
+    from datetime import datetime, timedelta
+    from config.database import session
+    from models.models import RefreshToken
+    from services.session_services import SessionService
+
+    now = datetime.utcnow()
+    rows = {
+        "expired": dict(expires_at=now - timedelta(days=1)),
+        "expired_long_revoked": dict(expires_at=now - timedelta(days=1), revoked_at=now - timedelta(days=2)),
+        "expired_just_revoked": dict(expires_at=now - timedelta(seconds=1), revoked_at=now),
+        "live": dict(expires_at=now + timedelta(days=1)),
+    }
+    db = session()
+    try:
+        for name, values in rows.items():
+            db.add(RefreshToken(token_hash=uuid.uuid4().hex, session_id=uuid.uuid4().hex, user_id=0,
+                                created_at=now - timedelta(days=8), **values))
+        db.commit()
+        service = SessionService()
+        assert service.prune(batch_size=1) >= 2
+        kept = {row.expires_at for row in db.query(RefreshToken).filter(RefreshToken.user_id == 0)}
+        assert kept == {rows["expired_just_revoked"]["expires_at"], rows["live"]["expires_at"]}
+    finally:
+        db.close()
@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import socket
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from utils.metrics import registry
+
+# Set by `python -m main serve`: directory holding one datagram socket per worker
+WORKER_BROADCAST_DIR = os.getenv("WORKER_BROADCAST_DIR", "")
+
+logger = logging.getLogger(__name__)
+
+broadcast_messages_total = registry.counter(
+    "worker_broadcast_messages_total", "Cache invalidations exchanged with sibling workers", ("direction",)
+)
+
+class WorkerBroadcast:
+    """
+    Cache invalidations fanned out to sibling worker processes
+
+    emit() applies a change through the local handler and sends it to
+    every other worker over Unix datagram sockets (one per worker, named
+    by pid, in WORKER_BROADCAST_DIR); a thread in each worker applies what
+    it receives. Delivery is best effort: a datagram to a busy or dead
+    worker is dropped, and the caches' TTLs bound how long that lasts.
+    Without a directory (a single process) only the local handler runs.
+    """
+
+    def __init__(self, directory: str = WORKER_BROADCAST_DIR):
+        self.directory = directory
+        self._handlers: Dict[str, Callable[..., Any]] = {}
+        self._receiver: Optional[socket.socket] = None
+        self._sender: Optional[socket.socket] = None
+        self._path: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, op: str, handler: Callable[..., Any]):
+        """Apply op with handler(**args), locally and when a sibling emits it"""
+        self._handlers[op] = handler
+
+    def _apply(self, op: str, args: Dict[str, Any]):
+        handler = self._handlers.get(op)
+        if handler is not None:
+            handler(**args)
+
+    def _peers(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return [
+            os.path.join(self.directory, name) for name in names
+            if name.endswith(".sock") and os.path.join(self.directory, name) != self._path
+        ]
+
+    def emit(self, op: str, **args):
+        """Apply a change here and broadcast it to the other workers"""
+        self._apply(op, args)
+        if self._sender is None:
+            return
+        data = json.dumps({"op": op, "args": args}).encode()
+        for peer in self._peers():
+            try:
+                self._sender.sendto(data, peer)
+                broadcast_messages_total.inc(direction="sent")
+            except (ConnectionRefusedError, FileNotFoundError):
+                # The worker is gone; its supervisor replaces it
+                continue
+            except BlockingIOError:
+                broadcast_messages_total.inc(direction="dropped")
+
+    def start(self):
+        """Bind this worker's socket and start receiving (no-op without a directory)"""
+        if not self.directory or self._receiver is not None:
+            return
+        self._path = os.path.join(self.directory, f"{os.getpid()}.sock")
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+        self._receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._receiver.bind(self._path)
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+        self._thread = threading.Thread(target=self._receive, name="worker-broadcast", daemon=True)
+        self._thread.start()
+
+    def _receive(self):
+        receiver = self._receiver
+        while True:
+            try:
+                data = receiver.recv(65536)
+            except OSError:
+                return  # socket closed by stop()
+            broadcast_messages_total.inc(direction="received")
+            try:
+                message = json.loads(data)
+                self._apply(message["op"], message["args"])
+            except Exception as e:
+                logger.warning("Ignoring bad worker broadcast: %s", e)
+
+    def stop(self):
+        receiver, self._receiver = self._receiver, None
+        sender, self._sender = self._sender, None
+        for sock in (receiver, sender):
+            if sock is not None:
+                sock.close()
+        if self._path and os.path.exists(self._path):
+            os.unlink(self._path)
+        self._path = None
+
+# Create broadcast instance
+worker_broadcast = WorkerBroadcast()
@@ -0,0 +1,232 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set
+from schemas.user import UserSnapshot
+
+# Cache configuration
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire at their own deadline"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or default if missing or expired"""
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if expires_at <= now:
+                self._remove(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None):
+        """Store value until expires_at (epoch seconds), capped at the cache TTL"""
+        deadline = time.time() + self.ttl
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (deadline, value)
+            self._added(key, value)
+            while len(self._data) > self.maxsize:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key: Hashable):
+        """Drop a single entry"""
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            for key in list(self._data):
+                self._remove(key)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    # Hooks called with the lock held; subclasses keep secondary indexes in sync
+    def _added(self, key: Hashable, value: Any):
+        pass
+
+    def _remove(self, key: Hashable):
+        self._data.pop(key, None)
+
+class TokenCache(TTLCache):
+    """Cache of verified JWT claims keyed by a digest of the raw token
+
+    Entries are indexed by the token subject so every cached token of a
+    user can be dropped when that user changes.
+    """
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE, ttl: float = TOKEN_CACHE_TTL):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self._by_subject: Dict[str, Set[str]] = {}
+
+    @staticmethod
+    def digest(token: str) -> str:
+        """Key used for a raw token (raw tokens are never kept in memory)"""
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get_claims(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return cached claims for a token, if it was verified before"""
+        return self.get(self.digest(token))
+
+    def set_claims(self, token: str, claims: Dict[str, Any]):
+        """Cache claims until the token's own exp"""
+        self.set(self.digest(token), claims, expires_at=claims.get("exp"))
+
+    def invalidate_subject(self, subject: Any):
+        """Drop every cached token issued to subject"""
+        with self._lock:
+            for key in list(self._by_subject.get(str(subject), ())):
+                self._remove(key)
+
+    def _added(self, key, value):
+        subject = value.get("sub")
+        if subject is not None:
+            self._by_subject.setdefault(str(subject), set()).add(key)
+
+    def _remove(self, key):
+        item = self._data.pop(key, None)
+        if item is None:
+            return
+        subject = item[1].get("sub")
+        keys = self._by_subject.get(str(subject))
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_subject[str(subject)]
+
+class CacheBackend:
+    """Key/value store interface behind UserCache
+
+    Values are plain JSON-compatible dicts so a shared store (Redis,
+    memcached) can implement the same three methods.
+    """
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Values for the keys that are present (shared stores should override with MGET)"""
+        values = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+class LocalCacheBackend(CacheBackend):
+    """In-process backend built on TTLCache"""
+
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, ttl):
+        self.cache.set(key, value, expires_at=time.time() + ttl)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+class UserCache:
+    """Cache of user snapshots (id, email, name, is_active), keyed by email and by id"""
+
+    def __init__(self, backend: Optional[CacheBackend] = None, ttl: float = USER_CACHE_TTL):
+        self.backend = backend or LocalCacheBackend()
+        self.ttl = ttl
+
+    @staticmethod
+    def key(email: str) -> str:
+        return f"user:email:{email}"
+
+    @staticmethod
+    def id_key(user_id: int) -> str:
+        return f"user:id:{user_id}"
+
+    def get(self, email: str) -> Optional[UserSnapshot]:
+        """Return the cached UserSnapshot for email, if any"""
+        data = self.backend.get(self.key(email))
+        return UserSnapshot(**data) if data is not None else None
+
+    def get_by_id(self, user_id: int) -> Optional[UserSnapshot]:
+        """Return the cached UserSnapshot for user_id, if any"""
+        data = self.backend.get(self.id_key(user_id))
+        return UserSnapshot(**data) if data is not None else None
+
+    def get_many_by_id(self, user_ids: Iterable[int]) -> Dict[int, UserSnapshot]:
+        """Return the cached snapshots among user_ids, keyed by id"""
+        found = self.backend.get_many([self.id_key(user_id) for user_id in user_ids])
+        return {data["id"]: UserSnapshot(**data) for data in found.values()}
+
+    def set(self, user) -> UserSnapshot:
+        """Cache a snapshot of a User row and return it"""
+        snapshot = UserSnapshot.model_validate(user)
+        data = snapshot.model_dump()
+        self.backend.set(self.key(snapshot.email), data, self.ttl)
+        self.backend.set(self.id_key(snapshot.id), data, self.ttl)
+        return snapshot
+
+    def invalidate_id(self, user_id: int, *emails: str):
+        """
+        Forget the snapshot for user_id, also under the email it was cached with
+
+        For writes that never loaded the old row: the cached snapshot
+        tells which (possibly previous) email key to drop as well.
+        """
+        data = self.backend.get(self.id_key(user_id))
+        if data is not None:
+            self.backend.delete(self.key(data["email"]))
+        for email in emails:
+            self.backend.delete(self.key(email))
+        self.backend.delete(self.id_key(user_id))
+
+# Create cache instances
+token_cache = TokenCache()
+user_cache = UserCache()
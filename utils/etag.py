@@ -0,0 +1,33 @@
+import hashlib
+from typing import Any, Dict, Optional
+from fastapi import Request, Response
+
+def user_etag(user_id: int, version: int) -> str:
+    """Strong ETag of a single user resource"""
+    return f'"user-{user_id}-v{version}"'
+
+def page_etag(page: Dict[str, Any], limit: int, after: Optional[int]) -> str:
+    """
+    Strong ETag of a user listing page
+
+    Built from the (id, version) watermark of the rows on the page plus
+    the paging parameters, so any insert, update or delete that changes
+    the page changes the tag. Items may be User rows or (id, version) rows.
+    """
+    digest = hashlib.sha1(repr((limit, after, page["next_cursor"])).encode())
+    for item in page["items"]:
+        digest.update(f"{item.id}:{item.version},".encode())
+    return f'"users-{digest.hexdigest()}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match header already names etag"""
+    header: Optional[str] = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
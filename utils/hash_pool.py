@@ -0,0 +1,100 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Optional
+from fastapi import HTTPException, status
+
+# Hash pool configuration
+HASH_POOL_MODE = os.getenv("HASH_POOL_MODE", "thread")  # "thread" or "process"
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_POOL_MAX_QUEUE = int(os.getenv("HASH_POOL_MAX_QUEUE", "32"))
+
+class HashWorkerPool:
+    """Bounded worker pool for CPU-heavy password hashing
+
+    Hashing runs on its own executor so a login storm cannot occupy the
+    threadpool that serves every other sync route. At most
+    ``workers + max_queue`` jobs are admitted; anything beyond that is
+    rejected straight away with a 503 instead of queueing behind bcrypt.
+    """
+
+    def __init__(self, workers: int = HASH_POOL_WORKERS, max_queue: int = HASH_POOL_MAX_QUEUE, mode: str = HASH_POOL_MODE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.mode = mode
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.rejected = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs running or waiting in the pool"""
+        return self._pending
+
+    def _get_executor(self):
+        """Create the executor on first use"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.mode == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers,
+                            thread_name_prefix="hash-worker"
+                        )
+        return self._executor
+
+    def _try_acquire(self) -> bool:
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                return False
+            self._pending += 1
+            return True
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, func: Callable[..., Any], *args) -> Optional[Future]:
+        """Queue func(*args) without waiting; returns None if the pool queue is full"""
+        if not self._try_acquire():
+            return None
+        try:
+            future = self._get_executor().submit(func, *args)
+        except Exception:
+            self._release()
+            raise
+        # Release the slot when the job finishes, not when the caller gives up,
+        # so a disconnected client cannot let the pool overfill
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """
+        Run func(*args) on the pool
+
+        Raises:
+            HTTPException: 503 if the pool queue is full
+        """
+        future = self.submit(func, *args)
+        if future is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the executor"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+# Create pool instance
+hash_pool = HashWorkerPool()
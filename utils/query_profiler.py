@@ -0,0 +1,119 @@
+import logging
+import os
+import threading
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+# QUERY_PROFILING=true counts SQL per request (Server-Timing header, /debug/queries)
+QUERY_PROFILING = os.getenv("QUERY_PROFILING", "false").lower() in ("1", "true", "yes")
+QUERY_SLOW_MS = float(os.getenv("QUERY_SLOW_MS", "200"))
+# The same statement run this many times in one request is reported as a likely N+1
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+
+logger = logging.getLogger(__name__)
+
+def redact(parameters: Any) -> Any:
+    """Bound parameters with every value replaced by its type name"""
+    if isinstance(parameters, dict):
+        return {key: f"<{type(value).__name__}>" for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: one parameter set per row
+            return [redact(parameters[0]), f"... {len(parameters)} rows"]
+        return [f"<{type(value).__name__}>" for value in parameters]
+    return parameters
+
+class RequestProfile:
+    """SQL statements run while serving one request"""
+
+    __slots__ = ("statements", "seconds", "counts")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+        self.counts: Counter = Counter()
+
+    def repeated(self, threshold: int = QUERY_REPEAT_THRESHOLD) -> Dict[str, int]:
+        return {statement: count for statement, count in self.counts.items() if count >= threshold}
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.1f};desc="{self.statements} queries"'
+
+class QueryProfiler:
+    """
+    Per-request statement counts and DB time, aggregated by route
+
+    The engine's cursor events call record(); the request being served is
+    found through a ContextVar, which Starlette copies into the threadpool
+    running sync routes, so statements land on the right request.
+    """
+
+    def __init__(self, slow_ms: float = QUERY_SLOW_MS, repeat_threshold: int = QUERY_REPEAT_THRESHOLD):
+        self.slow_ms = slow_ms
+        self.repeat_threshold = repeat_threshold
+        self._current: ContextVar[Optional[RequestProfile]] = ContextVar("query_profile", default=None)
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict[str, Any]] = {}
+        self._slow = deque(maxlen=100)
+
+    def start(self) -> RequestProfile:
+        profile = RequestProfile()
+        self._current.set(profile)
+        return profile
+
+    def record(self, statement: str, parameters: Any, seconds: float):
+        """Count one executed statement against the current request"""
+        profile = self._current.get()
+        if profile is not None:
+            profile.statements += 1
+            profile.seconds += seconds
+            profile.counts[statement] += 1
+        if seconds * 1000 >= self.slow_ms:
+            redacted = redact(parameters)
+            logger.warning("Slow query (%.1f ms): %s params=%s", seconds * 1000, statement, redacted)
+            with self._lock:
+                self._slow.append({"ms": round(seconds * 1000, 1), "statement": statement, "params": redacted})
+
+    def finish(self, route: str, profile: RequestProfile):
+        """Fold a finished request into the per-route report"""
+        self._current.set(None)
+        repeated = profile.repeated(self.repeat_threshold)
+        for statement, count in repeated.items():
+            logger.warning("Possible N+1 on %s: statement ran %d times: %s", route, count, statement)
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = {
+                    "requests": 0, "statements": 0, "max_statements": 0, "db_seconds": 0.0, "repeated": Counter(),
+                }
+            stats["requests"] += 1
+            stats["statements"] += profile.statements
+            stats["max_statements"] = max(stats["max_statements"], profile.statements)
+            stats["db_seconds"] += profile.seconds
+            stats["repeated"].update(repeated.keys())
+
+    def report(self) -> Dict[str, Any]:
+        """Aggregated per-route statement counts, repeated statements and recent slow queries"""
+        with self._lock:
+            routes = {
+                route: {
+                    "requests": stats["requests"],
+                    "avg_statements": round(stats["statements"] / stats["requests"], 2),
+                    "max_statements": stats["max_statements"],
+                    "avg_db_ms": round(stats["db_seconds"] * 1000 / stats["requests"], 2),
+                    "total_db_ms": round(stats["db_seconds"] * 1000, 1),
+                    # statement -> number of requests that repeated it
+                    "repeated_statements": dict(stats["repeated"].most_common(10)),
+                }
+                for route, stats in self._routes.items()
+            }
+            return {"routes": routes, "slow_queries": list(self._slow)}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self._slow.clear()
+
+# Create profiler instance
+query_profiler = QueryProfiler()
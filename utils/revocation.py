@@ -0,0 +1,49 @@
+import threading
+import time
+from typing import Dict, Iterable, Optional
+from utils.broadcast import worker_broadcast
+from utils.metrics import registry
+
+class RevocationList:
+    """
+    Login sessions whose access tokens are no longer accepted
+
+    Access tokens carry their session id (sid) and verify_token checks it
+    here on every request: a dict lookup, no database access. An entry is
+    only needed while tokens issued before the revocation can still be
+    unexpired, so each one carries that deadline and prune() drops it
+    afterwards. The refresh_tokens table is the source of truth; see
+    SessionService for how entries get here.
+    """
+
+    def __init__(self):
+        self._until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._until
+
+    def __len__(self) -> int:
+        return len(self._until)
+
+    def revoke(self, session_ids: Iterable[str], until: float):
+        """Reject tokens of these sessions until the epoch time `until`"""
+        with self._lock:
+            for session_id in session_ids:
+                if self._until.get(session_id, 0) < until:
+                    self._until[session_id] = until
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Drop sessions whose tokens have all expired; returns how many"""
+        now = time.time() if now is None else now
+        with self._lock:
+            live = {session_id: until for session_id, until in self._until.items() if until > now}
+            dropped = len(self._until) - len(live)
+            self._until = live
+        return dropped
+
+# Create revocation list instance
+revoked_sessions = RevocationList()
+registry.gauge("revoked_sessions", "Revoked login sessions held in memory", function=lambda: len(revoked_sessions))
+# Revocations reach every serve worker without waiting for the next table sync
+worker_broadcast.subscribe("session.revoke", revoked_sessions.revoke)
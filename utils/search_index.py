@@ -0,0 +1,147 @@
+import heapq
+import os
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+from utils.broadcast import worker_broadcast
+
+# USER_SEARCH_BACKEND=trigram serves /users/search from an in-process index
+# loaded at startup, with substring matches; "sql" (default) runs ranked
+# prefix range scans on the email and lower(name) indexes and finds prefixes only.
+USER_SEARCH_BACKEND = os.getenv("USER_SEARCH_BACKEND", "sql")
+# Rebuild the posting lists once stale entries outnumber live documents by this factor
+USER_SEARCH_COMPACT_RATIO = float(os.getenv("USER_SEARCH_COMPACT_RATIO", "1.0"))
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def match_rank(query: str, name: str, email: str) -> Optional[int]:
+    """0 exact, 1 prefix, 2 word prefix in name, 3 substring; None if no match"""
+    if query == email or query == name:
+        return 0
+    if email.startswith(query) or name.startswith(query):
+        return 1
+    if f" {query}" in name:
+        return 2
+    if query in email or query in name:
+        return 3
+    return None
+
+class TrigramIndex:
+    """
+    In-process substring index over user name and email
+
+    Each trigram maps to a compact array of user ids. Updates only append:
+    a changed or deleted user leaves stale ids behind, which searches drop
+    by re-checking the current text, and which compact() clears once they
+    outnumber the live documents. A search scans the posting list of the
+    query's rarest trigram, so queries must be at least 3 characters long.
+    """
+
+    min_query_length = 3
+
+    def __init__(self, compact_ratio: float = USER_SEARCH_COMPACT_RATIO):
+        self.compact_ratio = compact_ratio
+        self.ready = False
+        self._docs: Dict[int, Tuple[str, str, str]] = {}
+        self._postings: Dict[str, array] = {}
+        self._stale = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def build(self, rows: Iterable[Tuple[int, str, str]]):
+        """Index (id, name, email) rows from scratch and start accepting updates"""
+        with self._lock:
+            self._docs, self._postings, self._stale = {}, {}, 0
+            for user_id, name, email in rows:
+                self._add(user_id, name, email)
+            self.ready = True
+
+    def add(self, user_id: int, name: str, email: str):
+        """Index a new user, or the new name/email of an existing one"""
+        if not self.ready:
+            return
+        with self._lock:
+            if user_id in self._docs:
+                self._stale += 1
+            self._add(user_id, name, email)
+            self._maybe_compact()
+
+    def remove(self, user_id: int):
+        if not self.ready:
+            return
+        with self._lock:
+            if self._docs.pop(user_id, None) is not None:
+                self._stale += 1
+                self._maybe_compact()
+
+    def _add(self, user_id: int, name: str, email: str):
+        name_key, email_key = (name or "").lower(), (email or "").lower()
+        self._docs[user_id] = (name_key, email_key, name or "")
+        # \0 keeps trigrams from spanning the two fields
+        for gram in trigrams(f"{name_key}\0{email_key}"):
+            postings = self._postings.get(gram)
+            if postings is None:
+                postings = self._postings[gram] = array("i")
+            postings.append(user_id)
+
+    def _maybe_compact(self):
+        if self._stale > max(len(self._docs), 1) * self.compact_ratio:
+            self._compact()
+
+    def _compact(self):
+        docs = self._docs
+        self._docs, self._postings, self._stale = {}, {}, 0
+        for user_id, (name_key, email_key, name) in docs.items():
+            self._add(user_id, name, email_key)
+
+    def compact(self):
+        """Drop stale posting entries now"""
+        with self._lock:
+            self._compact()
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[List[dict], bool]:
+        """
+        Ranked matches for query as {id, name, email} dicts
+
+        Returns the requested page and whether more results follow.
+        Results are ordered by match_rank, then shorter names, then id.
+        """
+        query = query.lower()
+        grams = trigrams(query)
+        with self._lock:
+            # build() and compact() swap both maps; read them as one pair
+            docs, postings = self._docs, self._postings
+        lists = [postings.get(gram) for gram in grams]
+        if not lists or any(ids is None for ids in lists):
+            return [], False
+        rarest = min(lists, key=len)
+
+        seen = set()
+        ranked = []
+        for user_id in rarest:
+            if user_id in seen:
+                continue
+            seen.add(user_id)
+            doc = docs.get(user_id)
+            if doc is None:
+                continue
+            rank = match_rank(query, doc[0], doc[1])
+            if rank is not None:
+                ranked.append((rank, len(doc[0]), user_id))
+
+        top = heapq.nsmallest(offset + limit + 1, ranked)
+        page = [
+            {"id": user_id, "name": docs[user_id][2], "email": docs[user_id][1]}
+            for _, _, user_id in top[offset:offset + limit]
+            if user_id in docs
+        ]
+        return page, len(top) > offset + limit
+
+# Create index instance
+search_index = TrigramIndex()
+# Writes emit these so every serve worker's copy of the index follows them
+worker_broadcast.subscribe("search.add", search_index.add)
+worker_broadcast.subscribe("search.remove", search_index.remove)
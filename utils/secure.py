@@ -1,24 +1,127 @@
-import bcrypt
 import jwt
 import secrets
 import string
 import re
 import html
 import os
-from datetime import datetime, timedelta
+import time
+import logging
+from datetime import timedelta
 from typing import Optional, Dict, Any, Tuple
-from passlib.context import CryptContext
-from cryptography.fernet import Fernet
-import base64
+from utils.metrics import timed
+from utils.tokens import issue_token, token_verifier
 
-# Configuration
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-REFRESH_TOKEN_EXPIRE_DAYS = 7
+# Configuration (signing keys live in utils.tokens)
+# Access tokens are short-lived; clients renew them at /users/refresh
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
 
-# Password context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing: the first scheme hashes new passwords, the rest are only verified
+# and get rehashed on login. PASSWORD_HASH_TARGET_MS > 0 calibrates cost at startup.
+PASSWORD_HASH_SCHEMES = [scheme.strip() for scheme in os.getenv("PASSWORD_HASH_SCHEMES", "bcrypt").split(",") if scheme.strip()]
+PASSWORD_HASH_TARGET_MS = float(os.getenv("PASSWORD_HASH_TARGET_MS", "0"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "0"))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "0"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+
+logger = logging.getLogger(__name__)
+
+# Patterns compiled once at import rather than looked up on every call
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+PASSWORD_RULES = [
+    (re.compile(r"[A-Z]"), "Password must contain at least one uppercase letter"),
+    (re.compile(r"[a-z]"), "Password must contain at least one lowercase letter"),
+    (re.compile(r"\d"), "Password must contain at least one digit"),
+    (re.compile(r"[!@#$%^&*(),.?\":{}|<>]"), "Password must contain at least one special character"),
+]
+
+def hash_settings(bcrypt_rounds: int = BCRYPT_ROUNDS, argon2_time_cost: int = ARGON2_TIME_COST) -> Dict[str, Any]:
+    """CryptContext keyword settings for explicit cost parameters (0 keeps passlib defaults)"""
+    settings: Dict[str, Any] = {}
+    if bcrypt_rounds:
+        # min_rounds makes hashes with a lower cost "outdated", so they get rehashed
+        settings.update(bcrypt__default_rounds=bcrypt_rounds, bcrypt__min_rounds=bcrypt_rounds)
+    if argon2_time_cost:
+        settings.update(
+            argon2__time_cost=argon2_time_cost,
+            argon2__memory_cost=ARGON2_MEMORY_COST,
+        )
+    return settings
+
+def _time_hash_ms(handler, **params) -> float:
+    start = time.perf_counter()
+    handler.using(**params).hash("calibration-password")
+    return (time.perf_counter() - start) * 1000
+
+def calibrate_bcrypt_rounds(target_ms: float, min_rounds: int = 10, max_rounds: int = 16) -> int:
+    """Highest bcrypt cost whose hash time stays within target_ms on this machine"""
+    from passlib.hash import bcrypt as bcrypt_handler
+
+    elapsed = min(_time_hash_ms(bcrypt_handler, rounds=min_rounds) for _ in range(3))
+    rounds = min_rounds
+    # Each extra round doubles the work
+    while rounds < max_rounds and elapsed * 2 <= target_ms:
+        rounds += 1
+        elapsed *= 2
+    return rounds
+
+def calibrate_argon2_time_cost(target_ms: float, max_time_cost: int = 10) -> int:
+    """Highest argon2 time_cost (at ARGON2_MEMORY_COST) that stays within target_ms"""
+    from passlib.hash import argon2 as argon2_handler
+
+    time_cost = 1
+    while time_cost < max_time_cost:
+        elapsed = _time_hash_ms(argon2_handler, time_cost=time_cost + 1, memory_cost=ARGON2_MEMORY_COST)
+        if elapsed > target_ms:
+            break
+        time_cost += 1
+    return time_cost
+
+def calibrate_password_hashing(target_ms: float = PASSWORD_HASH_TARGET_MS) -> Dict[str, Any]:
+    """
+    Tune hash cost to take about target_ms per hash here and apply it to pwd_context
+
+    Explicit BCRYPT_ROUNDS / ARGON2_TIME_COST win over calibration. The
+    result is also written to the environment, and read back from it here,
+    so hash worker processes and serve workers started later reuse the
+    cost instead of calibrating again.
+    """
+    bcrypt_rounds = int(os.getenv("BCRYPT_ROUNDS", "0"))
+    argon2_time_cost = int(os.getenv("ARGON2_TIME_COST", "0"))
+    if target_ms > 0:
+        if "bcrypt" in PASSWORD_HASH_SCHEMES and not bcrypt_rounds:
+            bcrypt_rounds = calibrate_bcrypt_rounds(target_ms)
+            os.environ["BCRYPT_ROUNDS"] = str(bcrypt_rounds)
+        if "argon2" in PASSWORD_HASH_SCHEMES and not argon2_time_cost:
+            argon2_time_cost = calibrate_argon2_time_cost(target_ms)
+            os.environ["ARGON2_TIME_COST"] = str(argon2_time_cost)
+    settings = hash_settings(bcrypt_rounds, argon2_time_cost)
+    if settings:
+        get_pwd_context().update(**settings)
+        logger.info("Password hashing configured: %s", settings)
+    return settings
+
+# Password context, built on first use: passlib and its hash backends are slow to import
+_pwd_context = None
+
+def get_pwd_context():
+    """The shared passlib CryptContext"""
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+
+        _pwd_context = CryptContext(schemes=PASSWORD_HASH_SCHEMES, deprecated="auto", **hash_settings())
+    return _pwd_context
+
+def warm_up_password_hashing():
+    """Load the hash backends and run one hash so the first login does not pay for it"""
+    get_pwd_context().hash("warm-up-password")
+
+def __getattr__(name):
+    # Keeps ``from utils.secure import pwd_context`` working
+    if name == "pwd_context":
+        return get_pwd_context()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class SecurityUtils:
     """Security utility class with various security functions"""
@@ -26,31 +129,30 @@ class SecurityUtils:
     @staticmethod
     def hash_password(password: str) -> str:
         """Hash password using bcrypt"""
-        return pwd_context.hash(password)
+        with timed("bcrypt.hash"):
+            return get_pwd_context().hash(password)
     
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Verify password against hash"""
-        return pwd_context.verify(plain_password, hashed_password)
+        with timed("bcrypt.verify"):
+            return get_pwd_context().verify(plain_password, hashed_password)
+    
+    @staticmethod
+    def password_needs_rehash(hashed_password: str) -> bool:
+        """Whether a stored hash uses a deprecated scheme or an outdated cost"""
+        return get_pwd_context().needs_update(hashed_password)
     
     @staticmethod
     def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
-        """Create JWT access token"""
-        to_encode = data.copy()
-        if expires_delta:
-            expire = datetime.utcnow() + expires_delta
-        else:
-            expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        
-        to_encode.update({"exp": expire, "iat": datetime.utcnow()})
-        return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+        """Create JWT access token signed with the active key"""
+        return issue_token(data, expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     
     @staticmethod
     def decode_token(token: str) -> Dict[str, Any]:
         """Decode JWT token"""
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            return payload
+            return token_verifier.verify(token)
         except jwt.ExpiredSignatureError:
             raise ValueError("Token has expired")
         except jwt.InvalidTokenError:
@@ -75,22 +177,16 @@ class SecurityUtils:
     @staticmethod
     def validate_email_format(email: str) -> bool:
         """Validate email format"""
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return re.match(pattern, email) is not None
+        return EMAIL_PATTERN.match(email) is not None
     
     @staticmethod
     def validate_password_strength(password: str) -> Tuple[bool, str]:
         """Validate password strength"""
         if len(password) < 8:
             return False, "Password must be at least 8 characters long"
-        if not re.search(r"[A-Z]", password):
-            return False, "Password must contain at least one uppercase letter"
-        if not re.search(r"[a-z]", password):
-            return False, "Password must contain at least one lowercase letter"
-        if not re.search(r"\d", password):
-            return False, "Password must contain at least one digit"
-        if not re.search(r"[!@#$%^&*(),.?\":{}|<>]", password):
-            return False, "Password must contain at least one special character"
+        for pattern, message in PASSWORD_RULES:
+            if not pattern.search(password):
+                return False, message
         return True, "Password is strong"
 
 # Create utility instance
@@ -99,6 +195,7 @@ security = SecurityUtils()
 # Export commonly used functions
 hash_password = security.hash_password
 verify_password = security.verify_password
+password_needs_rehash = security.password_needs_rehash
 create_access_token = security.create_access_token
 decode_token = security.decode_token
 generate_random_token = security.generate_random_token
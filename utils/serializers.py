@@ -0,0 +1,66 @@
+import os
+from operator import attrgetter
+from typing import Any, Dict, Iterable, List
+from fastapi.responses import ORJSONResponse
+from schemas.user import UserResponse
+from utils.metrics import timed
+
+# FAST_SERIALIZATION=true builds response bytes directly from ORM rows
+FAST_SERIALIZATION = os.getenv("FAST_SERIALIZATION", "false").lower() in ("1", "true", "yes")
+
+class ModelSerializer:
+    """
+    Precompiled dict builder for a flat response model
+
+    Reads the model's fields straight off trusted objects (ORM rows or
+    dicts) without running Pydantic validation, for use where the data
+    came from our own database and was validated on the way in.
+    """
+
+    def __init__(self, model):
+        self.fields = tuple(model.model_fields)
+        getter = attrgetter(*self.fields)
+        if len(self.fields) == 1:
+            self._values = lambda obj: (getter(obj),)
+        else:
+            self._values = getter
+
+    def to_dict(self, obj: Any) -> Dict[str, Any]:
+        if isinstance(obj, dict):
+            return {field: obj[field] for field in self.fields}
+        return dict(zip(self.fields, self._values(obj)))
+
+    def to_list(self, objs: Iterable[Any]) -> List[Dict[str, Any]]:
+        fields, values = self.fields, self._values
+        return [
+            {field: obj[field] for field in fields} if isinstance(obj, dict) else dict(zip(fields, values(obj)))
+            for obj in objs
+        ]
+
+user_serializer = ModelSerializer(UserResponse)
+
+def user_content(user) -> Dict[str, Any]:
+    return user_serializer.to_dict(user)
+
+def user_page_content(page: Dict[str, Any]) -> Dict[str, Any]:
+    return {"items": user_serializer.to_list(page["items"]), "next_cursor": page["next_cursor"]}
+
+def user_search_content(page: Dict[str, Any]) -> Dict[str, Any]:
+    return {"items": user_serializer.to_list(page["items"]), "next_offset": page["next_offset"]}
+
+def user_batch_content(batch: Dict[str, Any]) -> Dict[str, Any]:
+    return {"items": user_serializer.to_list(batch["items"]), "missing": batch["missing"]}
+
+def token_content(token: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "access_token": token["access_token"],
+        "token_type": token["token_type"],
+        "expires_in": token["expires_in"],
+        "refresh_token": token.get("refresh_token"),
+        "user": user_serializer.to_dict(token["user"]),
+    }
+
+def fast_response(build, obj, status_code: int = 200) -> ORJSONResponse:
+    """Serialize obj with a content builder straight into an orjson response"""
+    with timed("serialize"):
+        return ORJSONResponse(build(obj), status_code=status_code)
@@ -0,0 +1,137 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+import jwt
+
+# Signing keys: JWT_KEYS="kid:secret,kid:secret"; new tokens use JWT_ACTIVE_KID.
+# Keep a retired key listed until the last token signed with it has expired.
+# Without JWT_KEYS, SECRET_KEY is the only key (kid "default").
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
+JWT_KEYS = os.getenv("JWT_KEYS", "")
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID", "")
+ALGORITHM = "HS256"
+DEFAULT_KID = "default"
+
+def parse_keys(spec: str) -> Dict[str, str]:
+    """Parse "kid:secret,kid:secret" into {kid: secret}"""
+    keys = {}
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        kid, sep, secret = entry.strip().partition(":")
+        if not sep or not kid or not secret:
+            raise ValueError("JWT_KEYS entries must look like kid:secret")
+        keys[kid] = secret
+    return keys
+
+class KeyRing:
+    """
+    HMAC signing keys by key id (kid)
+
+    Tokens are signed with the active key and carry its kid in the header;
+    any key on the ring verifies, so rotating the active key does not log
+    anybody out. Key objects are prepared once, not per token.
+    """
+
+    def __init__(self, keys: Dict[str, str], active_kid: Optional[str] = None):
+        if not keys:
+            raise ValueError("KeyRing needs at least one key")
+        self.active_kid = active_kid or next(iter(keys))
+        if self.active_kid not in keys:
+            raise ValueError(f"Active key id {self.active_kid!r} is not in the key ring")
+        self._secrets = {kid: secret.encode() for kid, secret in keys.items()}
+        self._macs = {kid: hmac.new(secret, digestmod=hashlib.sha256) for kid, secret in self._secrets.items()}
+
+    @classmethod
+    def from_env(cls) -> "KeyRing":
+        keys = parse_keys(JWT_KEYS) or {DEFAULT_KID: SECRET_KEY}
+        return cls(keys, JWT_ACTIVE_KID or None)
+
+    def mac(self, kid: str) -> Optional["hmac.HMAC"]:
+        """Keyed HMAC-SHA256 for kid, ready to copy(), or None if unknown"""
+        return self._macs.get(kid)
+
+    def sign(self, claims: Dict[str, Any]) -> str:
+        """Encode claims as a JWT signed with the active key"""
+        return jwt.encode(claims, self._secrets[self.active_kid], algorithm=ALGORITHM,
+                          headers={"kid": self.active_kid})
+
+def _b64decode(segment: str) -> bytes:
+    """
+    Decode an unpadded base64url segment, accepting only its canonical form
+
+    urlsafe_b64decode skips characters outside the alphabet and ignores
+    the unused low bits of the last character, so one token would have
+    many spellings that verify (and each would miss the token cache).
+    """
+    data = base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+    if base64.urlsafe_b64encode(data).rstrip(b"=") != segment.encode("ascii"):
+        raise binascii.Error("Non-canonical base64url segment")
+    return data
+
+def _numeric_date(claims: Dict[str, Any], name: str, label: str) -> Optional[float]:
+    value = claims.get(name)
+    if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+        raise jwt.DecodeError(f"{label} claim ({name}) must be an integer")
+    return value
+
+class TokenVerifier:
+    """
+    Shared HS256 verifier for tokens issued by a KeyRing
+
+    Checks the signature with the key named by the token's kid (tokens
+    without a kid are checked against the "default" key) and the exp, nbf
+    and iat claims. Raises PyJWT's exceptions, so callers handle it like
+    jwt.decode.
+    """
+
+    def __init__(self, keyring: KeyRing, leeway: float = 0):
+        self.keyring = keyring
+        self.leeway = leeway
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        try:
+            signing_input, _, signature = token.rpartition(".")
+            header_segment, _, payload_segment = signing_input.partition(".")
+            header = json.loads(_b64decode(header_segment))
+            if header.get("alg") != ALGORITHM:
+                raise jwt.InvalidAlgorithmError("The specified alg value is not allowed")
+            mac = self.keyring.mac(header.get("kid", DEFAULT_KID))
+            if mac is None:
+                raise jwt.InvalidSignatureError("Unknown key id")
+            mac = mac.copy()
+            mac.update(signing_input.encode("ascii"))
+            if not hmac.compare_digest(mac.digest(), _b64decode(signature)):
+                raise jwt.InvalidSignatureError("Signature verification failed")
+            claims = json.loads(_b64decode(payload_segment))
+        except (ValueError, TypeError, AttributeError, binascii.Error) as e:
+            raise jwt.DecodeError("Invalid token") from e
+        if not isinstance(claims, dict):
+            raise jwt.DecodeError("Invalid payload")
+
+        now = time.time()
+        exp = _numeric_date(claims, "exp", "Expiration Time")
+        if exp is not None and exp <= now - self.leeway:
+            raise jwt.ExpiredSignatureError("Signature has expired")
+        nbf = _numeric_date(claims, "nbf", "Not Before")
+        if nbf is not None and nbf > now + self.leeway:
+            raise jwt.ImmatureSignatureError("The token is not yet valid (nbf)")
+        iat = _numeric_date(claims, "iat", "Issued At")
+        if iat is not None and iat > now + self.leeway:
+            raise jwt.ImmatureSignatureError("The token is not yet valid (iat)")
+        return claims
+
+def issue_token(claims: Dict[str, Any], expires_delta: timedelta) -> str:
+    """Sign claims with the active key, adding iat and exp"""
+    now = datetime.utcnow()
+    return keyring.sign({**claims, "iat": now, "exp": now + expires_delta})
+
+# Shared instances
+keyring = KeyRing.from_env()
+token_verifier = TokenVerifier(keyring)